@@ -0,0 +1,123 @@
+# bench_vision.py — Per-square vs batched piece classification benchmark
+#
+# Runs VisionSystem.identify_piece square by square (the old detect_pieces
+# loop) and VisionSystem.classify_squares on the same warped boards,
+# checks that every square gets the same answer and reports the time per
+# board for each. Frames come from image files (a recorded dataset), or
+# from synthetic boards with random pieces when none are given.
+#
+#   python3 bench_vision.py --record frames/ 50       # save 50 camera frames
+#   python3 bench_vision.py frames/*.png [--repeat 20]
+#   python3 bench_vision.py --synthetic 100
+
+import argparse
+import os
+import statistics
+import time
+import cv2
+import numpy as np
+from vision_system import VisionSystem
+
+BOARD_SIZE = 800  # Warped board side, as in detect_pieces
+
+def classify_per_square(vision: VisionSystem, warped: np.ndarray) -> np.ndarray:
+    """The original loop: one identify_piece call per square"""
+    square_size = warped.shape[0] // vision.squares
+    labels = np.full((vision.squares, vision.squares), '', dtype='<U1')
+    for row in range(vision.squares):
+        for col in range(vision.squares):
+            x = col * square_size
+            y = row * square_size
+            labels[row, col] = vision.identify_piece(warped[y:y+square_size, x:x+square_size]) or ''
+    return labels
+
+def synthetic_boards(count: int, seed: int = 1):
+    """Warped-board images with random red / black pieces on a checker pattern plus noise"""
+    rng = np.random.default_rng(seed)
+    square = BOARD_SIZE // 8
+    for _ in range(count):
+        board = np.zeros((BOARD_SIZE, BOARD_SIZE, 3), dtype=np.uint8)
+        for row in range(8):
+            for col in range(8):
+                shade = 200 if (row + col) % 2 == 0 else 60
+                board[row*square:(row+1)*square, col*square:(col+1)*square] = shade
+                piece = rng.choice(["", "B", "R"], p=[0.6, 0.2, 0.2])
+                if piece:
+                    color = (30, 30, 30) if piece == "B" else (160, 60, 200)
+                    cv2.circle(board, (col*square + square//2, row*square + square//2), square//3, color, -1)
+        noise = rng.integers(-40, 41, board.shape)
+        yield np.clip(board.astype(int) + noise, 0, 255).astype(np.uint8)
+
+def recorded_boards(paths, vision: VisionSystem):
+    """Warp each recorded camera frame with the calibrated (or detected) board corners"""
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Skipping {path}: not an image")
+            continue
+        if vision.board_corners is None and vision.detect_board(frame) is None:
+            print(f"Skipping {path}: no board found")
+            continue
+        yield vision.warp_board(frame, BOARD_SIZE).copy()
+
+def record(directory: str, count: int):
+    vision = VisionSystem()
+    if not vision.init_camera():
+        return
+    os.makedirs(directory, exist_ok=True)
+    try:
+        for i in range(count):
+            frame = vision.capture_frame()
+            if frame is not None:
+                cv2.imwrite(os.path.join(directory, f"frame_{i:04d}.png"), frame)
+    finally:
+        vision.release_camera()
+    print(f"Saved {count} frames to {directory}")
+
+def time_per_board(classify, boards, repeat):
+    """Median seconds per board over `repeat` passes"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for board in boards:
+            classify(board)
+        samples.append((time.perf_counter() - start) / len(boards))
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-square vs batched piece classification")
+    parser.add_argument("images", nargs="*", help="Recorded camera frames")
+    parser.add_argument("--calibration", default="calibration_data.npz", help="Board corners for the frames")
+    parser.add_argument("--synthetic", type=int, default=50, help="Synthetic boards when no images are given")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--record", nargs=2, metavar=("DIR", "COUNT"), help="Save camera frames and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record[0], int(args.record[1]))
+        return
+
+    vision = VisionSystem()
+    if args.images:
+        try:
+            vision.board_corners = np.load(args.calibration)["image_corners"].astype("float32")
+        except (OSError, KeyError):
+            pass  # Detect the board in the first frame instead
+        boards = list(recorded_boards(args.images, vision))
+    else:
+        boards = list(synthetic_boards(args.synthetic))
+    if not boards:
+        print("No boards to classify")
+        return
+
+    mismatches = 0
+    for board in boards:
+        mismatches += int(np.count_nonzero(classify_per_square(vision, board) != vision.classify_squares(board)))
+    loop = time_per_board(lambda board: classify_per_square(vision, board), boards, args.repeat)
+    batched = time_per_board(vision.classify_squares, boards, args.repeat)
+    print(f"{len(boards)} boards, {mismatches} squares classified differently")
+    print(f"per square {loop * 1e3:8.3f} ms/board")
+    print(f"batched    {batched * 1e3:8.3f} ms/board   ({loop / batched:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ class BoardSystem:
         self.board_size_mm = board_size_mm
         self.squares = squares
         self.square_size_mm = board_size_mm / squares
+        self.square_size_y_mm = None  # Set when Y squares differ from X (see set_square_sizes)
         self.board_offset_x = 0.0
         self.board_offset_y = 0.0
 
@@ -32,7 +33,7 @@ class BoardSystem:
             board_y += 0.5
 
         cnc_x = self.board_offset_x + board_x * self.square_size_mm
-        cnc_y = self.board_offset_y + board_y * self.square_size_mm
+        cnc_y = self.board_offset_y + board_y * (self.square_size_y_mm or self.square_size_mm)
         return cnc_x, cnc_y
 
     def cnc_to_board(self, cnc_x: float, cnc_y: float) -> Tuple[int, int]:
@@ -43,7 +44,7 @@ class BoardSystem:
         y_relative = cnc_y - self.board_offset_y
 
         board_x = int(x_relative / self.square_size_mm)
-        board_y = int(y_relative / self.square_size_mm)
+        board_y = int(y_relative / (self.square_size_y_mm or self.square_size_mm))
 
         return board_x, board_y
 
@@ -60,5 +61,16 @@ class BoardSystem:
         Set square size and adjust the board size accordingly
         """
         self.square_size_mm = size_mm
+        self.square_size_y_mm = None
         self.board_size_mm = size_mm * self.squares
         print(f"Square size set to {size_mm:.2f} mm — board size is now {self.board_size_mm:.2f} mm")
+
+    def set_square_sizes(self, size_x_mm: float, size_y_mm: float) -> None:
+        """
+        Set separate square sizes for X and Y, for boards whose CNC travel
+        per square is not the same on both axes
+        """
+        self.square_size_mm = size_x_mm
+        self.square_size_y_mm = size_y_mm
+        self.board_size_mm = size_x_mm * self.squares
+        print(f"Square size set to {size_x_mm:.2f} x {size_y_mm:.2f} mm")
@@ -0,0 +1,123 @@
+# cnc_journal.py — Compact binary journal of every command cnc_server handles
+#
+# File layout: MAGIC, then one record per command:
+#
+#   wall time (float64) | session id (uint32) | kind (uint8) |
+#   seconds to reply (float32) | command length (uint16) | reply length (uint16) |
+#   command bytes | reply bytes
+#
+# Text commands are stored as their line and reply line (utf-8, no
+# newline); binary sessions store the raw request and reply frames. Each
+# server start writes an empty KIND_RUN record first, since session ids
+# restart at 1 while the journal is appended to. The journal rotates to
+# <path>.1 ... <path>.<keep> when it passes max_bytes.
+# replay_journal.py feeds a journal back to a server or the simulator.
+
+import os
+import struct
+import time
+from collections import namedtuple
+
+MAGIC = b"CNCJ\x01"
+RECORD = struct.Struct("!dIBfHH")
+KIND_TEXT = 0
+KIND_BINARY = 1
+KIND_RUN = 2  # Server start marker
+MAX_FIELD = 0xFFFF
+
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+JOURNAL_KEEP = 4            # Rotated files kept besides the live one
+JOURNAL_FLUSH_INTERVAL = 1.0  # Seconds between flushes to disk
+
+Record = namedtuple("Record", "time session kind seconds command reply")
+
+class Journal:
+    """
+    Append-only journal writer, one per server run. record() only appends
+    to the file buffer, so it is cheap enough for the event loop; flush()
+    writes it out.
+    """
+    def __init__(self, path, max_bytes=JOURNAL_MAX_BYTES, keep=JOURNAL_KEEP):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.file = None
+        self.size = 0
+        self.records = 0
+        self._open()
+        self.record(0, KIND_RUN, b"", b"", 0.0)
+
+    def _open(self):
+        self.file = open(self.path, "ab")
+        self.size = self.file.tell()
+        if self.size == 0:
+            self.file.write(MAGIC)
+            self.size = len(MAGIC)
+
+    def _rotate(self):
+        self.file.close()
+        for n in range(self.keep, 0, -1):
+            older = f"{self.path}.{n}"
+            newer = f"{self.path}.{n - 1}" if n > 1 else self.path
+            if os.path.exists(newer):
+                os.replace(newer, older)
+        self._open()
+
+    def record(self, session, kind, command, reply, seconds):
+        """Append one command; command and reply are str (text) or bytes (frames)"""
+        if isinstance(command, str):
+            command = command.encode()
+        if isinstance(reply, str):
+            reply = reply.encode()
+        command = command[:MAX_FIELD]
+        reply = reply[:MAX_FIELD]
+        self.file.write(RECORD.pack(time.time(), session, kind, seconds, len(command), len(reply)))
+        self.file.write(command)
+        self.file.write(reply)
+        self.size += RECORD.size + len(command) + len(reply)
+        self.records += 1
+        if self.size >= self.max_bytes:
+            self._rotate()
+
+    def flush(self):
+        """Push buffered records to disk; the server calls this every JOURNAL_FLUSH_INTERVAL"""
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def journal_files(path):
+    """The live journal and its rotated files, oldest first"""
+    files = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        files.insert(0, f"{path}.{n}")
+        n += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def read_journal(path):
+    """
+    Yield Records from one journal file. A record cut short by a crash
+    ends the file quietly.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a cnc_server journal")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            wall, session, kind, seconds, command_len, reply_len = RECORD.unpack(header)
+            command = f.read(command_len)
+            reply = f.read(reply_len)
+            if len(command) < command_len or len(reply) < reply_len:
+                return
+            if kind == KIND_TEXT:
+                command = command.decode(errors="replace")
+                reply = reply.decode(errors="replace")
+            yield Record(wall, session, kind, seconds, command, reply)
@@ -0,0 +1,161 @@
+# cnc_metrics.py — Counters and latency histograms for cnc_server
+#
+# Every histogram and counter has exactly one writer thread: the event
+# loop records parse, dispatch, queue wait, send and per-command totals,
+# the motion thread records execution time and busy time. dispatch is a
+# command's run on the event loop (all of it for replies made there, just
+# the submit for motion), exec is a motion job's run on the motion thread. With a single writer no
+# lock is needed; readers (STATS, the HTTP endpoint) may see a sample
+# half-way through being added, which is fine for monitoring.
+
+import asyncio
+import bisect
+import json
+import time
+
+# Upper bounds in seconds; the last bucket catches everything slower
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+STAGES = ("parse", "dispatch", "queue", "exec", "send")
+MAX_COMMAND_NAMES = 32
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound if bound != float("inf") else BUCKETS[-2]
+        return BUCKETS[-2]
+
+    def summary(self):
+        return {"count": self.count,
+                "mean": round(self.total / self.count, 6) if self.count else 0.0,
+                "p50": self.percentile(50), "p99": self.percentile(99)}
+
+started = time.monotonic()
+stages = {stage: Histogram() for stage in STAGES}
+commands = {}        # command name -> Histogram of time from receive to reply sent
+counters = {"connections_total": 0, "commands_total": 0, "errors_total": 0,
+            "alloc_commands": 0, "alloc_blocks": 0, "watchdog_trips": 0,
+            "frames_sent": 0, "frame_bytes": 0}
+frame_encode = Histogram()  # JPEG encode time per frame (frame_stream encoder thread)
+motion_busy = 0.0    # Seconds the motion thread spent running jobs
+
+def observe_command(name, seconds, error=False):
+    """Record one command's end-to-end time on the server (event loop only)"""
+    histogram = commands.get(name)
+    if histogram is None:
+        if len(commands) >= MAX_COMMAND_NAMES:
+            name = "OTHER"  # Don't let garbage input grow the table
+        histogram = commands.setdefault(name, Histogram())
+    histogram.observe(seconds)
+    counters["commands_total"] += 1
+    if error:
+        counters["errors_total"] += 1
+
+def observe_job(wait, run):
+    """Record a finished motion job's queue wait and run time (motion thread only)"""
+    global motion_busy
+    stages["queue"].observe(wait)
+    stages["exec"].observe(run)
+    motion_busy += run
+
+def observe_alloc(blocks):
+    """Record the blocks one text command's dispatch left allocated: its reply, any job record (event loop only)"""
+    counters["alloc_commands"] += 1
+    counters["alloc_blocks"] += blocks
+
+def observe_encode(seconds):
+    """Record one JPEG encode for the frame stream (encoder thread only)"""
+    frame_encode.observe(seconds)
+
+def uptime():
+    return time.monotonic() - started
+
+def duty_cycle():
+    """Fraction of uptime the motion thread has been moving"""
+    return motion_busy / max(uptime(), 1e-9)
+
+def snapshot(connections_open, queue_depth, extra=None):
+    data = {
+        "uptime": round(uptime(), 3),
+        "connections_open": connections_open,
+        "queue_depth": queue_depth,
+        "motion_duty_cycle": round(duty_cycle(), 4),
+        "alloc_blocks_per_command": round(counters["alloc_blocks"] / max(counters["alloc_commands"], 1), 2),
+        "counters": dict(counters),
+        "stages": {stage: h.summary() for stage, h in stages.items()},
+        "commands": {name: h.summary() for name, h in list(commands.items())},
+    }
+    if extra:
+        data.update(extra)
+    return data
+
+def stats_line(connections_open, queue_depth, extra=None):
+    """STATS reply: the snapshot as one line of compact JSON"""
+    return json.dumps(snapshot(connections_open, queue_depth, extra), separators=(",", ":")) + "\n"
+
+def _prometheus_histogram(lines, name, labels, histogram):
+    cumulative = 0
+    for bound, n in zip(BUCKETS, histogram.counts):
+        cumulative += n
+        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+        lines.append(f'{name}_bucket{{{labels}le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels.rstrip(',')}}} {histogram.total:.6f}")
+    lines.append(f"{name}_count{{{labels.rstrip(',')}}} {histogram.count}")
+
+def prometheus_text(connections_open, queue_depth):
+    """Metrics in the Prometheus text exposition format"""
+    lines = [
+        "# TYPE cnc_uptime_seconds gauge", f"cnc_uptime_seconds {uptime():.3f}",
+        "# TYPE cnc_connections_open gauge", f"cnc_connections_open {connections_open}",
+        "# TYPE cnc_queue_depth gauge", f"cnc_queue_depth {queue_depth}",
+        "# TYPE cnc_motion_busy_seconds_total counter", f"cnc_motion_busy_seconds_total {motion_busy:.3f}",
+    ]
+    for name, value in counters.items():
+        lines += [f"# TYPE cnc_{name} counter", f"cnc_{name} {value}"]
+    lines.append("# TYPE cnc_stage_seconds histogram")
+    for stage, histogram in stages.items():
+        _prometheus_histogram(lines, "cnc_stage_seconds", f'stage="{stage}",', histogram)
+    lines.append("# TYPE cnc_frame_encode_seconds histogram")
+    _prometheus_histogram(lines, "cnc_frame_encode_seconds", "", frame_encode)
+    lines.append("# TYPE cnc_command_seconds histogram")
+    for command, histogram in list(commands.items()):
+        _prometheus_histogram(lines, "cnc_command_seconds", f'command="{command}",', histogram)
+    return "\n".join(lines) + "\n"
+
+async def serve_http(host, port, gauges):
+    """
+    Minimal HTTP endpoint answering every GET with prometheus_text().
+    gauges() returns (connections_open, queue_depth) at scrape time.
+    """
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = prometheus_text(*gauges()).encode()
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port, reuse_address=True)
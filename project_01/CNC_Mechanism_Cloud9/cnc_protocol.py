@@ -0,0 +1,53 @@
+# cnc_protocol.py — Binary framing shared by cnc_server and remote_motor_control
+#
+# A client switches its session to binary by sending the text line "BINARY"
+# and waiting for "OK BINARY". After that every message both ways is a frame:
+#
+#   opcode (1 byte) | payload length (2 bytes, big endian) | payload
+#
+# Keep this file identical on the Beagle and the Windows side.
+
+import struct
+
+HEADER = struct.Struct("!BH")
+MAX_PAYLOAD = 0xFFFF
+
+# Client -> server
+OP_JOG = 0x01          # x, y, z as float32; reply OP_RESULT when the move ends
+OP_GET_POSITION = 0x02  # no payload; reply OP_POSITION
+OP_STATUS = 0x03       # job id uint32; reply OP_STATUS_REPLY
+OP_JOG_ASYNC = 0x04    # x, y, z as float32; reply OP_ACK, later OP_EVENT_DONE
+OP_TEXT = 0x05         # any text command; reply OP_TEXT_REPLY
+OP_QUIT = 0x0F
+
+# Server -> client
+OP_RESULT = 0x81        # result code uint8, then optional utf-8 detail
+OP_POSITION = 0x82      # x, y, z as float32
+OP_STATUS_REPLY = 0x83  # job id uint32, state uint8, exec seconds float32
+OP_ACK = 0x84           # job id uint32
+OP_TEXT_REPLY = 0x85    # utf-8 reply line without newline
+OP_EVENT_DONE = 0x90    # job id uint32, result code uint8, exec seconds float32
+
+XYZ = struct.Struct("!fff")
+JOB_ID = struct.Struct("!I")
+RESULT = struct.Struct("!B")
+JOB_STATE = struct.Struct("!IBf")
+
+RESULT_OK = 0
+RESULT_ERROR = 1
+
+STATE_UNKNOWN = 0
+STATE_QUEUED = 1
+STATE_RUNNING = 2
+STATE_DONE = 3
+STATE_CANCELLED = 4
+STATE_CODES = {"QUEUED": STATE_QUEUED, "RUNNING": STATE_RUNNING, "DONE": STATE_DONE,
+               "CANCELLED": STATE_CANCELLED}
+
+def frame(opcode, payload=b""):
+    """Build one frame"""
+    return HEADER.pack(opcode, len(payload)) + payload
+
+def result_code(result):
+    """Map a text result such as "OK" to its binary result code"""
+    return RESULT_OK if result.startswith("OK") else RESULT_ERROR
@@ -1,61 +1,1130 @@
-# cnc_server.py — Fresh TCP Server with XY limit reporting
+# cnc_server.py — asyncio TCP Server with XY limit reporting
 
-import socket
+import time
+STARTED = time.monotonic()  # Reference point for the STARTUP timing breakdown
+
+import asyncio
+import itertools
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import motor_control as mc
 import home_cnc as hc
+import cnc_protocol as proto
+import cnc_metrics as metrics
+import cnc_journal
+from board_system import BoardSystem
+
+IMPORT_TIME = time.monotonic() - STARTED
 
 HOST = '0.0.0.0'
 PORT = 9999
+JOG_PORT = 9998         # UDP port for the low-latency jog channel
+JOURNAL_PATH = "cnc_journal.bin"  # Every command and reply is appended here; None turns it off
+METRICS_PORT = None    # Set to e.g. 9100 to serve Prometheus metrics over HTTP
+FRAME_PORT = None      # Set to e.g. 8080 to stream camera frames over HTTP (needs OpenCV)
+MAX_LINE_LENGTH = 8192  # Longest command line accepted before the session is dropped (PATH lines are long)
+RECV_BUFFER = 2 * MAX_LINE_LENGTH  # Fixed receive buffer per connection; also caps binary frame size
+
+# Motion runs on its own thread, one command at a time, so the event loop
+# can keep answering status queries from every client while the gantry moves
+motion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="motion")
+MOTION_QUEUE_SIZE = 32  # Jobs queued or running before new motion is refused with BUSY
+JOB_HISTORY = 200  # Finished jobs kept around for STATUS polling
+RECENT_JOBS = 50   # Finished jobs averaged for the QUEUE_STATUS timing
+PIECE_DWELL = 0.3  # Seconds to let the magnet settle when picking up / releasing
+MAX_DWELL = 10.0    # Longest PATH waypoint dwell accepted, in seconds
+DWELL_SLICE = 0.05  # Dwells sleep in slices this long so CANCEL and the watchdog get in
+
+# Board geometry used by MOVE; loaded from calibration_data.npz or set by SET_BOARD
+board = BoardSystem()
+
+MAX_TELEMETRY_RATE = 50.0         # Hz, highest SUBSCRIBE rate accepted
+TELEMETRY_MAX_BUFFER = 16 * 1024  # Unsent bytes after which a subscriber's samples are dropped
+STATE_KEEPALIVE = 0.5             # Seconds between empty EVT STATE lines when nothing changes
+MIN_HEARTBEAT = 0.1   # Shortest HEARTBEAT timeout accepted, in seconds
+MAX_HEARTBEAT = 60.0
+SEND_TIMEOUT = 5.0    # Seconds a client may leave replies unread before it is dropped
+
+connection_count = 0
+session_ids = itertools.count(1)  # Journal session ids; 0 is the UDP jog channel
+journal = None
+camera_feed = None  # frame_stream.CameraFeed while FRAME_PORT is set
+homed = False       # Motion is refused until homing has finished
+startup = OrderedDict([("imports", IMPORT_TIME)])  # Startup step -> seconds
+startup_error = None  # "<step> <error>" if bring-up failed
+ERROR_REPLIES = ("ERROR", "BAD", "UNKNOWN", "BUSY")  # Reply prefixes counted as errors in STATS
+
+def log_command(session_id, kind, command, reply, seconds):
+    """Append one command to the journal, if journaling is on"""
+    if journal:
+        journal.record(session_id, kind, command, reply, seconds)
+
+class BadCommand(Exception):
+    """A command whose arguments don't parse; reply is the line sent back"""
+    def __init__(self, name, reply):
+        super().__init__(reply)
+        self.name = name
+        self.reply = reply
+
+def parse_args(name, fields, convert, count, error):
+    """Convert every field, or raise BadCommand(error); count=None takes any number"""
+    try:
+        args = tuple(convert(field) for field in fields)
+    except ValueError:
+        raise BadCommand(name, error) from None
+    if count is not None and len(args) != count:
+        raise BadCommand(name, error)
+    return args
 
-def handle_command(command):
-    parts = command.strip().split()
+def parse_command(command):
+    """
+    Split a command line into its name and decoded arguments, so all the
+    parsing is done (and timed) before anything runs. args is None for
+    commands that take none, or when a command has the wrong number and
+    is answered UNKNOWN CMD. Raises BadCommand for arguments that don't parse.
+    """
+    parts = command.split()
     if not parts:
-        return "EMPTY\n"
+        return "", None
+    name, fields = parts[0], parts[1:]
+    if (name == "JOG_TO" and len(fields) == 3) or name == "JOG_TO_ASYNC":
+        return name, parse_args(name, fields, float, 3, "BAD JOG FORMAT")
+    if name == "MOVE" and len(fields) == 4:
+        return name, parse_args(name, fields, int, 4, "BAD MOVE FORMAT")
+    if name == "PATH" and fields:
+        return name, (parse_args(name, fields, parse_waypoint, None, "BAD PATH FORMAT"),)
+    if name == "SET_BOARD" and len(fields) == 4:
+        return name, parse_args(name, fields, float, 4, "BAD BOARD FORMAT")
+    if name == "SUBSCRIBE" and len(fields) in (1, 2):
+        if fields[1:] not in ([], ["DELTA"]):
+            raise BadCommand(name, "BAD SUBSCRIBE FORMAT")
+        rate, = parse_args(name, fields[:1], float, 1, "BAD SUBSCRIBE FORMAT")
+        return name, (rate, len(fields) == 2)
+    if name == "HEARTBEAT" and len(fields) == 1:
+        return name, parse_args(name, fields, float, 1, "BAD HEARTBEAT FORMAT")
+    if name in ("STATUS", "CANCEL") and len(fields) == 1:
+        return name, parse_args(name, fields, int, 1, f"BAD {name} FORMAT")
+    return name, None
 
-    if parts[0] == "JOG_TO" and len(parts) == 4:
-        try:
-            x, y, z = map(float, parts[1:])
-            mc.move_to_position(x, y, z)
-            return "OK\n"
-        except ValueError:
-            return "BAD JOG FORMAT\n"
+def handle_command(name, args):
+    """Commands that only read or set machine state"""
+    if not name:
+        return "EMPTY\n"
 
-    elif parts[0] == "MOVE" and len(parts) == 5:
-        try:
-            x1, y1, x2, y2 = map(int, parts[1:])
-            return f"Move logic for board squares {x1},{y1} → {x2},{y2} not yet implemented\n"
-        except ValueError:
-            return "BAD MOVE FORMAT\n"
+    if name == "SET_BOARD" and args is not None:
+        x0, y0, size_x, size_y = args
+        # x0, y0 is the centre of square (0, 0)
+        board.set_board_offset(x0 - size_x / 2, y0 - size_y / 2)
+        board.set_square_sizes(size_x, size_y)
+        return "OK\n"
 
-    elif parts[0] == "GET_POSITION":
+    elif name == "GET_POSITION":
         x, y, z = mc.get_current_position()
         return f"POS {x:.2f} {y:.2f} {z:.2f}\n"
 
-    elif parts[0] == "GET_XY_LIMITS":
+    elif name == "GET_XY_LIMITS":
         x_min, x_max, y_min, y_max = mc.get_limit_positions()
         return f"{x_min:.2f},{x_max:.2f},{y_min:.2f},{y_max:.2f}\n"
 
     return "UNKNOWN CMD\n"
 
-def main():
-    print("[Beagle] Initializing system...")
-    mc.init_motors()
-    hc.init_limit_switches()
+def jog(x, y, z):
+    mc.move_to_position(x, y, z)
+    return "OK\n"
+
+def execute_piece_move(x1, y1, x2, y2):
+    """
+    Pick up the piece on board square (x1, y1) and place it on (x2, y2)
+    using the homed Z heights. Runs on the motion thread.
+    Replies with the time spent in each phase.
+    """
+    if not (board.is_valid_square(x1, y1) and board.is_valid_square(x2, y2)):
+        return "ERROR INVALID SQUARE\n"
+
+    start_x, start_y = board.board_to_cnc(x1, y1)
+    end_x, end_y = board.board_to_cnc(x2, y2)
+    if not (mc.is_within_limits(start_x, start_y) and mc.is_within_limits(end_x, end_y)):
+        return "ERROR OUT OF RANGE\n"
+
+    z_min, z_max = hc.get_z_limits(mc)
+    z_attach = z_max - 2.0
+    z_place = z_min + 2.0
+
+    print(f"[Beagle] Moving piece {x1},{y1} -> {x2},{y2}")
+    timings = []
+    t = time.monotonic()
+
+    def phase(name):
+        nonlocal t
+        now = time.monotonic()
+        timings.append((name, now - t))
+        t = now
+
+    # Travel to the piece with the magnet down
+    mc.move_to_position(start_x, start_y, z_min)
+    phase("approach")
+
+    # Raise the magnet to grab the piece
+    mc.move_z(z_attach)
+    time.sleep(PIECE_DWELL)
+    phase("attach")
+
+    # Carry it across with Z held up
+    mc.move_to_position(end_x, end_y, z_attach)
+    phase("carry")
+
+    # Lower to the place height and let it settle
+    mc.move_z(z_place)
+    time.sleep(PIECE_DWELL)
+    phase("place")
+
+    # Drop the magnet clear of the piece
+    mc.move_z(z_min)
+    phase("release")
+
+    phases = " ".join(f"{name}={seconds:.3f}" for name, seconds in timings)
+    total = sum(seconds for _, seconds in timings)
+    return f"OK MOVE {phases} total={total:.3f}\n"
+
+def parse_waypoint(token):
+    """Parse one PATH waypoint "x,y,z" or "x,y,z,dwell" into (x, y, z, dwell)"""
+    values = [float(v) for v in token.split(",")]
+    if len(values) == 3:
+        values.append(0.0)
+    if len(values) != 4 or not 0 <= values[3] <= MAX_DWELL:
+        raise ValueError(token)
+    return tuple(values)
+
+def plan_path(waypoints):
+    """
+    Plan a whole path before moving. Drops waypoints that don't move the
+    gantry and merges runs along one axis (same X or same Y) at the same Z
+    with no dwell between them, so each straight line is one move instead
+    of many. Diagonal runs are kept: move_to_position drives X then Y, so
+    merging them would turn a staircase into one big L.
+    """
+    planned = []
+    for point in waypoints:
+        if planned and point[:3] == planned[-1][:3]:
+            # Same spot again, just add up any dwell
+            planned[-1] = planned[-1][:3] + (planned[-1][3] + point[3],)
+            continue
+        if len(planned) >= 2:
+            ax, ay, az, _ = planned[-2]
+            bx, by, bz, b_dwell = planned[-1]
+            cx, cy, cz, _ = point
+            same_axis = (ax == bx == cx and (by - ay) * (cy - by) > 0) or \
+                        (ay == by == cy and (bx - ax) * (cx - bx) > 0)
+            if b_dwell == 0 and az == bz == cz and same_axis:
+                planned[-1] = point
+                continue
+        planned.append(point)
+    return planned
+
+def execute_path(waypoints):
+    """Check the whole path against the limits, then run it as one sequence"""
+    for x, y, _, _ in waypoints:
+        if not mc.is_within_limits(x, y):
+            return f"ERROR OUT OF RANGE {x:.2f},{y:.2f}\n"
+
+    planned = plan_path(waypoints)
+    start = time.monotonic()
+    for x, y, z, dwell in planned:
+        mc.move_to_position(x, y, z)
+        if dwell:
+            sleep_unless_stopped(dwell)
+        if mc.stop_requested:
+            break
+    return f"OK PATH points={len(waypoints)} moves={len(planned)} time={time.monotonic() - start:.3f}\n"
+
+# Text commands that run on the motion thread: name -> action(*parsed args)
+MOTION_COMMANDS = {"JOG_TO": jog, "MOVE": execute_piece_move, "PATH": execute_path}
+
+def sleep_unless_stopped(seconds):
+    """time.sleep that returns early once mc.request_stop() is called"""
+    # Counts the sleeps rather than the clock, so cnc_simulator's --speed scales it
+    while seconds > 0 and not mc.stop_requested:
+        step = min(seconds, DWELL_SLICE)
+        time.sleep(step)
+        seconds -= step
+
+def load_board_calibration(path="calibration_data.npz"):
+    """Load board geometry saved by CalibrationSystem, if there is one"""
+    try:
+        import numpy as np
+        data = np.load(path)
+        board.set_board_offset(float(data['board_offset_x']), float(data['board_offset_y']))
+        board.set_square_size(float(data['board_size_mm']) / board.squares)
+        print(f"[Beagle] Board calibration loaded from {path}")
+    except Exception as e:
+        print(f"[Beagle] No board calibration loaded ({e}); waiting for SET_BOARD")
+
+def timed_step(name, action, *args):
+    """Run one startup step and record how long it took, or how it failed"""
+    global startup_error
+    start = time.monotonic()
+    try:
+        return action(*args)
+    except Exception as e:
+        startup_error = f"{name} {e}"
+        print(f"[Beagle] Startup failed at {name}: {e}")
+        raise
+    finally:
+        startup[name] = time.monotonic() - start
+
+def bring_up():
+    """
+    Hardware init and homing. Runs as the first motion job, after the
+    socket is already bound, so status queries are answered right away
+    and motion commands get ERROR NOT_HOMED until this finishes.
+    """
+    global homed
+    timed_step("init_motors", mc.init_motors)
+    timed_step("init_limit_switches", hc.init_limit_switches)
+    timed_step("homing", hc.home_cnc, mc)
+    homed = True
+    timed_step("board_calibration", load_board_calibration)
+    startup["ready"] = time.monotonic() - STARTED
+    print(f"[Beagle] Ready {startup['ready']:.2f}s after launch")
+    return "OK"
+
+def home():
+    """HOME command: re-home all axes; motion stays refused until it succeeds"""
+    global homed
+    homed = False
     hc.home_cnc(mc)
+    homed = True
+    return "OK HOMED"
+
+def park():
+    """Bring Z to Z_RELEASE_POSITION where the gantry stands: the watchdog's safe state"""
+    mc.move_z(mc.Z_RELEASE_POSITION)
+    x, y, z = mc.get_current_position()
+    return f"OK PARKED {x:.2f} {y:.2f} {z:.2f}"
+
+def startup_times():
+    return {name: round(seconds, 4) for name, seconds in list(startup.items())}
+
+def startup_line():
+    """STARTUP reply: homed flag, seconds per startup step in order, then FAILED <step> <error> if bring-up failed"""
+    steps = " ".join(f"{name}={seconds:.3f}" for name, seconds in list(startup.items()))
+    failed = f" FAILED {startup_error}" if startup_error else ""
+    return f"STARTUP homed={int(homed)} {steps}{failed}\n"
+
+class MotionJob:
+    """
+    One motion command handed to the motion thread: action(*args), with
+    the arguments already parsed on the event loop. command is the text
+    shown in STATUS and the logs.
+    """
+    def __init__(self, job_id, command, action, args=()):
+        self.id = job_id
+        self.command = command
+        self.action = action
+        self.args = args
+        self.state = "QUEUED"
+        self.result = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.cancelled = False
+
+    def run(self):
+        # Runs on the motion thread
+        self.state = "RUNNING"
+        self.started = time.monotonic()
+        mc.clear_stop()
+        try:
+            self.result = self.action(*self.args).strip()
+        except Exception as e:
+            self.result = f"ERROR {e}"
+        self.finished = time.monotonic()
+        if self.cancelled:
+            self.result = "CANCELLED"
+            self.state = "CANCELLED"
+        else:
+            self.state = "DONE"
+        recent_jobs.append(self)
+        metrics.observe_job(self.wait_time(), self.exec_time())
+        return self.result
+
+    def cancel(self):
+        """
+        Cancel the job: a queued job is dropped before it starts, a running
+        one is stopped at the next motor step. Returns False if it already
+        finished.
+        """
+        if self.future.cancel():
+            self.cancelled = True
+            self.result = "CANCELLED"
+            self.finished = time.monotonic()
+            self.state = "CANCELLED"
+            return True
+        if self.state == "RUNNING":
+            self.cancelled = True
+            mc.request_stop()
+            return True
+        return False
+
+    def active(self):
+        return self.state in ("QUEUED", "RUNNING")
+
+    def wait_time(self):
+        """Seconds spent queued (so far, if it has not started)"""
+        return (self.started or self.finished or time.monotonic()) - self.submitted
+
+    def exec_time(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def status(self):
+        if self.state == "DONE":
+            return f"STATUS {self.id} DONE {self.result} {self.exec_time():.3f}\n"
+        return f"STATUS {self.id} {self.state}\n"
+
+class MotionRefused(Exception):
+    """Motion not accepted; reply is the line sent back to the client"""
+    reply = "ERROR"
+
+class QueueFull(MotionRefused):
+    reply = "BUSY QUEUE_FULL"
+
+class NotHomed(MotionRefused):
+    reply = "ERROR NOT_HOMED"
+
+job_ids = itertools.count(1)
+jobs = OrderedDict()  # job id -> MotionJob, oldest first
+recent_jobs = deque(maxlen=RECENT_JOBS)  # Last finished jobs, for QUEUE_STATUS timing
+
+def submit_motion(command, action, args=(), needs_home=True):
+    """
+    Queue a motion command on the motion thread and return its job.
+    Raises QueueFull once MOTION_QUEUE_SIZE jobs are waiting or running,
+    so a fast producer gets pushed back instead of piling up work, and
+    NotHomed while the machine has not been homed yet.
+    """
+    if needs_home and not homed:
+        raise NotHomed()
+    if queue_depth() >= MOTION_QUEUE_SIZE:
+        raise QueueFull()
+    job = MotionJob(next(job_ids), command, action, args)
+    job.future = motion_executor.submit(job.run)
+    loop = asyncio.get_running_loop()
+    job.future.add_done_callback(lambda _: loop.call_soon_threadsafe(notify_state))
+    jobs[job.id] = job
+    notify_state()
+    while len(jobs) > JOB_HISTORY:
+        oldest = next(iter(jobs.values()))
+        if oldest.active():
+            break
+        jobs.popitem(last=False)
+    return job
+
+async def wait_job(job):
+    """Wait for a job to finish or be cancelled and return its result"""
+    try:
+        await asyncio.wrap_future(job.future)
+    except asyncio.CancelledError:
+        if not job.cancelled:
+            raise
+    return job.result
+
+def flush_queue():
+    """Cancel every job that has not started yet; returns how many were dropped"""
+    return sum(1 for job in list(jobs.values()) if job.state == "QUEUED" and job.cancel())
+
+def queue_status():
+    """
+    One-line queue report: depth, the running job with its run time so far,
+    queued jobs with their wait so far, and average wait / run time of the
+    last RECENT_JOBS finished jobs.
+    """
+    active = [job for job in jobs.values() if job.active()]
+    running = [f"{job.id}:{job.exec_time():.3f}" for job in active if job.state == "RUNNING"]
+    queued = [f"{job.id}:{job.wait_time():.3f}" for job in active if job.state == "QUEUED"]
+    recent = list(recent_jobs)
+    avg_wait = sum(job.wait_time() for job in recent) / len(recent) if recent else 0.0
+    avg_exec = sum(job.exec_time() for job in recent) / len(recent) if recent else 0.0
+    return (f"QUEUE depth={len(active)} max={MOTION_QUEUE_SIZE} "
+            f"running={','.join(running) or '-'} queued={','.join(queued) or '-'} "
+            f"recent={len(recent)} avg_wait={avg_wait:.3f} avg_exec={avg_exec:.3f}\n")
+
+def trip_watchdog(reason):
+    """
+    A controller that armed HEARTBEAT went quiet: stop the move in
+    progress, drop everything queued and park Z, so the machine is not
+    left mid-sequence with a piece on the magnet.
+    """
+    metrics.counters["watchdog_trips"] += 1
+    # Cancelled first, so the queue has room for the park
+    stopped = sum(1 for job in list(jobs.values()) if job.active() and job.cancel())
+    print(f"[Beagle] Watchdog: {reason}; stopped {stopped} job(s), parking Z")
+    if homed:
+        try:
+            submit_motion("PARK", park, needs_home=False)
+        except MotionRefused as e:
+            # Runs from a connection's cleanup, so never let this escape
+            print(f"[Beagle] Watchdog could not park Z: {e.reply}")
+
+async def watch_heartbeat(conn):
+    """Trip the watchdog once conn hears nothing for its HEARTBEAT timeout"""
+    try:
+        while conn.heartbeat and not conn.closed():
+            silent = time.monotonic() - conn.last_heard
+            if silent < conn.heartbeat or conn.read_paused:
+                # A paused reader has unread data waiting, so the client is alive
+                await asyncio.sleep(max(conn.heartbeat - silent, MIN_HEARTBEAT))
+                continue
+            trip_watchdog(f"no heartbeat from {conn.addr} for {silent:.2f}s")
+            conn.heartbeat = 0.0
+            conn.close()
+    finally:
+        conn.watchdog_task = None
+
+def notify_done(job, conn):
+    """Push a completion event to the client that submitted the job"""
+    if conn.closed():
+        return
+    if conn.binary:
+        payload = proto.JOB_STATE.pack(job.id, proto.result_code(job.result), job.exec_time())
+        conn.send_bytes(proto.frame(proto.OP_EVENT_DONE, payload))
+    else:
+        conn.send(f"EVT DONE {job.id} {job.result} {job.exec_time():.3f}\n")
+
+def dispatch(name, args, command, conn):
+    """
+    Run one parsed command (parse_command) without waiting: returns the
+    reply line, or the MotionJob to wait on for motion, which goes to the
+    motion thread. JOG_TO_ASYNC is acknowledged with a job id straight
+    away and a "EVT DONE <id> <result> <seconds>" line is pushed when it
+    finishes.
+    """
+    if name == "PING":
+        return "PONG" + command[4:] + "\n"
+
+    if name in MOTION_COMMANDS and args is not None:
+        try:
+            return submit_motion(command, MOTION_COMMANDS[name], args)
+        except MotionRefused as e:
+            return e.reply + "\n"
+
+    if name == "HOME":
+        try:
+            return submit_motion("HOME", home, needs_home=False)
+        except MotionRefused as e:
+            return e.reply + "\n"
+
+    if name == "JOG_TO_ASYNC":
+        x, y, z = args
+        try:
+            job = submit_motion(f"JOG_TO {x:.2f} {y:.2f} {z:.2f}", jog, args)
+        except MotionRefused as e:
+            return e.reply + "\n"
+        loop = asyncio.get_running_loop()
+        job.future.add_done_callback(lambda _: loop.call_soon_threadsafe(notify_done, job, conn))
+        return f"ACK {job.id}\n"
+
+    if name == "SUBSCRIBE" and args is not None:
+        rate, delta = args
+        if conn.binary:
+            return "ERROR SUBSCRIBE NEEDS A TEXT SESSION\n"
+        if not 0 < rate <= MAX_TELEMETRY_RATE:
+            return f"ERROR RATE MUST BE 0-{MAX_TELEMETRY_RATE:g}\n"
+        conn.stop_telemetry()
+        stream = stream_state if delta else stream_telemetry
+        conn.telemetry_task = asyncio.create_task(stream(conn, rate))
+        return f"OK SUBSCRIBED {rate:g}{' DELTA' if delta else ''}\n"
+
+    if name == "HEARTBEAT" and args is not None:
+        timeout, = args
+        if timeout and not MIN_HEARTBEAT <= timeout <= MAX_HEARTBEAT:
+            return f"ERROR HEARTBEAT MUST BE 0 OR {MIN_HEARTBEAT:g}-{MAX_HEARTBEAT:g}\n"
+        conn.arm_heartbeat(timeout)
+        return f"OK HEARTBEAT {timeout:g}\n"
 
-    print(f"[Beagle] Listening on {HOST}:{PORT}...")
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
-        server.bind((HOST, PORT))
-        server.listen(1)
+    if name == "UNSUBSCRIBE":
+        conn.stop_telemetry()
+        return "OK\n"
+
+    if name == "STATUS" and args is not None:
+        job_id, = args
+        job = jobs.get(job_id)
+        if job is None:
+            return f"STATUS {job_id} UNKNOWN\n"
+        return job.status()
+
+    if name == "CANCEL" and args is not None:
+        job_id, = args
+        job = jobs.get(job_id)
+        if job is None or not job.cancel():
+            return f"ERROR JOB {job_id} NOT ACTIVE\n"
+        # A running job stops at its next motor step; its DONE CANCELLED follows
+        return f"OK {'CANCELLED' if job.state == 'CANCELLED' else 'CANCELLING'} {job.id}\n"
+
+    if name == "FLUSH":
+        return f"OK FLUSHED {flush_queue()}\n"
+
+    if name == "QUEUE_STATUS":
+        return queue_status()
+
+    if name == "STATS":
+        return metrics.stats_line(connection_count, queue_depth(),
+                                  {"homed": homed, "startup": startup_times(), "startup_error": startup_error,
+                                   "stream": camera_feed.stats() if camera_feed else None})
+
+    if name == "STARTUP":
+        return startup_line()
+
+    return handle_command(name, args)
+
+def queue_depth():
+    """Motion jobs submitted but not finished yet"""
+    return sum(1 for job in jobs.values() if job.active())
+
+def telemetry_line():
+    x, y, z = mc.get_current_position()
+    z_state = "DOWN" if z <= mc.Z_RELEASE_POSITION else "UP"
+    triggered = [name for name, hit in hc.check_axis_limits().items() if hit]
+    return (f"pos={x:.2f},{y:.2f},{z:.2f} z={z_state} "
+            f"limits={','.join(triggered) or '-'} queue={queue_depth()}")
+
+async def stream_telemetry(conn, rate):
+    """
+    Push "EVT TELEM ..." samples to one subscriber at the given rate.
+    Each sample is a full snapshot, so when the client is not keeping up
+    (its unsent data passes TELEMETRY_MAX_BUFFER) samples are skipped
+    rather than queued; the next one sent is always the latest state.
+    Motion never waits on a subscriber.
+    """
+    interval = 1.0 / rate
+    dropped = 0
+    next_time = time.monotonic()
+    while not conn.closed():
+        if conn.buffered() > TELEMETRY_MAX_BUFFER:
+            dropped += 1
+        else:
+            conn.send(f"EVT TELEM t={time.monotonic():.3f} {telemetry_line()} dropped={dropped}\n")
+        next_time += interval
+        await asyncio.sleep(max(0.0, next_time - time.monotonic()))
+
+state_waiters = set()  # One asyncio.Event per delta subscriber
+
+def notify_state():
+    """Wake every delta subscriber now instead of at its next tick"""
+    for event in state_waiters:
+        event.set()
+
+def state_fields():
+    x, y, z = mc.get_current_position()
+    triggered = [name for name, hit in hc.check_axis_limits().items() if hit]
+    return {
+        "pos": f"{x:.2f},{y:.2f},{z:.2f}",
+        "switches": ",".join(triggered) or "-",
+        "xy_limits": ",".join(f"{v:.2f}" for v in mc.get_limit_positions()),
+        "homed": str(int(homed)),
+        "queue": str(queue_depth()),
+    }
+
+async def stream_state(conn, rate):
+    """
+    Machine-state mirror feed for SUBSCRIBE <rate> DELTA. The first
+    "EVT STATE t=.. field=value ..." line has every field, later ones only
+    the fields that changed. A motion job finishing pushes a line straight
+    away; otherwise state is sampled at `rate` Hz and, when nothing has
+    changed, an empty line goes out every STATE_KEEPALIVE seconds so the
+    client can tell its mirror is still live.
+    """
+    interval = 1.0 / rate
+    changed = asyncio.Event()
+    state_waiters.add(changed)
+    sent = {}
+    last_send = 0.0
+    try:
+        while not conn.closed():
+            now = time.monotonic()
+            if conn.buffered() <= TELEMETRY_MAX_BUFFER:
+                fields = state_fields()
+                delta = {k: v for k, v in fields.items() if sent.get(k) != v}
+                if delta or now - last_send >= STATE_KEEPALIVE:
+                    items = "".join(f" {k}={v}" for k, v in delta.items())
+                    conn.send(f"EVT STATE t={now:.3f}{items}\n")
+                    sent = fields
+                    last_send = now
+            changed.clear()
+            try:
+                await asyncio.wait_for(changed.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        state_waiters.discard(changed)
+
+def parse_binary(opcode, payload):
+    """
+    Decode a binary frame's payload before it runs: the XYZ target of a
+    jog, the id for OP_STATUS, (command, name, args) for OP_TEXT, None
+    otherwise. Raises BadCommand for payloads that don't decode.
+    """
+    if opcode in (proto.OP_JOG, proto.OP_JOG_ASYNC):
+        if len(payload) != proto.XYZ.size:
+            raise BadCommand("JOG", "BAD JOG FORMAT")
+        return proto.XYZ.unpack(payload)
+    if opcode == proto.OP_STATUS and len(payload) == proto.JOB_ID.size:
+        return proto.JOB_ID.unpack(payload)
+    if opcode == proto.OP_TEXT:
+        command = str(payload, "utf-8", "replace").strip()
+        return (command,) + parse_command(command)
+    return None
+
+def text_frame(opcode, text):
+    """A text reply framed for the request: OP_TEXT_REPLY for OP_TEXT, else an error OP_RESULT"""
+    if opcode == proto.OP_TEXT:
+        return proto.frame(proto.OP_TEXT_REPLY, text.strip().encode())
+    return proto.frame(proto.OP_RESULT, proto.RESULT.pack(proto.RESULT_ERROR) + text.strip().encode())
+
+def dispatch_binary(opcode, args, conn):
+    """Run one decoded binary frame without waiting: returns the reply frame, or the MotionJob to wait on"""
+    if opcode == proto.OP_GET_POSITION:
+        return proto.frame(proto.OP_POSITION, proto.XYZ.pack(*mc.get_current_position()))
+
+    if opcode in (proto.OP_JOG, proto.OP_JOG_ASYNC):
+        x, y, z = args
+        try:
+            job = submit_motion(f"JOG_TO {x:.2f} {y:.2f} {z:.2f}", jog, args)
+        except MotionRefused as e:
+            return text_frame(opcode, e.reply)
+        if opcode == proto.OP_JOG_ASYNC:
+            loop = asyncio.get_running_loop()
+            job.future.add_done_callback(lambda _: loop.call_soon_threadsafe(notify_done, job, conn))
+            return proto.frame(proto.OP_ACK, proto.JOB_ID.pack(job.id))
+        return job
+
+    if opcode == proto.OP_STATUS and args is not None:
+        job_id, = args
+        job = jobs.get(job_id)
+        if job is None:
+            state, exec_time = proto.STATE_UNKNOWN, 0.0
+        else:
+            state = proto.STATE_CODES[job.state]
+            exec_time = job.exec_time() if not job.active() else 0.0
+        return proto.frame(proto.OP_STATUS_REPLY, proto.JOB_STATE.pack(job_id, state, exec_time))
+
+    if opcode == proto.OP_TEXT:
+        command, name, text_args = args
+        reply = dispatch(name, text_args, command, conn)
+        return reply if isinstance(reply, MotionJob) else text_frame(opcode, reply)
+
+    return proto.frame(proto.OP_RESULT, proto.RESULT.pack(proto.RESULT_ERROR) + b"UNKNOWN OPCODE")
+
+async def serve_binary(conn):
+    """Serve a session that negotiated binary framing, until QUIT or disconnect"""
+    while True:
+        header = await conn.read_exactly(proto.HEADER.size)
+        if header is None:
+            return
+        opcode, length = proto.HEADER.unpack(header)
+        if length > RECV_BUFFER:
+            print(f"[Beagle] Dropping {conn.addr}: {length} byte frame exceeds {RECV_BUFFER} bytes")
+            return
+        payload = await conn.read_exactly(length) if length else b""
+        if payload is None:
+            return
+        received = conn.received  # The whole frame is in
+        if opcode == proto.OP_QUIT:
+            conn.disarm_heartbeat()  # A clean goodbye, not a dead controller
+            return
+        # payload is a view into the receive buffer, which a frame pipelined in
+        # during the await may overwrite: copy it for the journal now
+        request = proto.frame(opcode, payload) if journal else None
+        try:
+            args, reply = parse_binary(opcode, payload), None
+        except BadCommand as e:
+            args, reply = None, text_frame(opcode, e.reply)
+        dispatched = time.perf_counter()
+        metrics.stages["parse"].observe(dispatched - received)
+        if reply is None:
+            reply = dispatch_binary(opcode, args, conn)
+            metrics.stages["dispatch"].observe(time.perf_counter() - dispatched)
+        if isinstance(reply, MotionJob):
+            result = await wait_job(reply)
+            if opcode == proto.OP_TEXT:
+                reply = text_frame(opcode, result)
+            else:
+                reply = proto.frame(proto.OP_RESULT, proto.RESULT.pack(proto.result_code(result)))
+        sending = time.perf_counter()
+        conn.send_bytes(reply)
+        if journal:
+            log_command(conn.session_id, cnc_journal.KIND_BINARY, request, reply, sending - received)
+        await conn.drain()
+        done = time.perf_counter()
+        metrics.stages["send"].observe(done - sending)
+        error = reply[0] == proto.OP_RESULT and reply[proto.HEADER.size] != proto.RESULT_OK
+        metrics.observe_command(f"BINARY_{opcode:02X}", done - received, error)
+
+class LineTooLong(Exception):
+    pass
+
+class ClientConnection(asyncio.BufferedProtocol):
+    """
+    One client session. The transport receives straight into a fixed
+    RECV_BUFFER bytearray (recv_into through get_buffer/buffer_updated)
+    and lines are found and decoded in place, so the receive path makes
+    one str per command and nothing per recv. When the buffer fills up
+    with unread data, reading pauses until the session catches up, so a
+    fast client can never make a connection hold more than RECV_BUFFER.
+    """
+    def __init__(self):
+        self.buffer = bytearray(RECV_BUFFER)
+        self.view = memoryview(self.buffer)
+        self.start = 0          # First unread byte
+        self.end = 0            # End of received data
+        self.eof = False
+        self.read_paused = False
+        self.data_waiter = None
+        self.write_paused = False
+        self.drain_waiter = None
+        self.transport = None
+        self.addr = None
+        self.binary = False
+        self.telemetry_task = None
+        self.task = None
+        self.session_id = next(session_ids)
+        self.received = None  # perf_counter() when the last line or frame had fully arrived
+        self.arrived = None   # perf_counter() of the last recv
+        self.heartbeat = 0.0  # HEARTBEAT timeout in seconds, 0 while not armed
+        self.last_heard = time.monotonic()
+        self.watchdog_task = None
+
+    # Protocol callbacks
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info("peername")
+        self.task = asyncio.get_running_loop().create_task(handle_client(self))
+
+    def get_buffer(self, sizehint):
+        return self.view[self.end:]
+
+    def buffer_updated(self, nbytes):
+        self.end += nbytes
+        self.arrived = time.perf_counter()
+        self.last_heard = time.monotonic()
+        if self.end == len(self.buffer):
+            self.transport.pause_reading()
+            self.read_paused = True
+        self._wake_reader()
+
+    def eof_received(self):
+        self.eof = True
+        self._wake_reader()
+
+    def connection_lost(self, exc):
+        self.eof = True
+        self._wake_reader()
+        if self.drain_waiter and not self.drain_waiter.done():
+            self.drain_waiter.set_exception(ConnectionResetError("Connection lost"))
+
+    def pause_writing(self):
+        self.write_paused = True
+
+    def resume_writing(self):
+        self.write_paused = False
+        if self.drain_waiter and not self.drain_waiter.done():
+            self.drain_waiter.set_result(None)
+
+    # Buffer management
+
+    def _wake_reader(self):
+        if self.data_waiter and not self.data_waiter.done():
+            self.data_waiter.set_result(None)
+
+    def _consume(self, upto):
+        self.start = upto
+        if self.start == self.end:
+            self.start = self.end = 0  # Common case: everything read, nothing to move
+
+    async def _wait_for_data(self):
+        if self.read_paused:
+            # Full: move the unread tail to the front to make room, then read more
+            unread = self.end - self.start
+            self.buffer[:unread] = self.buffer[self.start:self.end]
+            self.start, self.end = 0, unread
+            self.read_paused = False
+            self.transport.resume_reading()
+        self.data_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.data_waiter
+        finally:
+            self.data_waiter = None
+
+    # Session interface used by handle_client / serve_binary
+
+    async def read_line(self):
+        """
+        Return the next command line without its newline, or None once the
+        client has gone. Raises LineTooLong for lines over MAX_LINE_LENGTH.
+        Sets received to when the line's last bytes came in (now, for a
+        line that was already buffered), before it is found and decoded.
+        """
+        self.received = time.perf_counter()
         while True:
-            conn, addr = server.accept()
-            with conn:
-                print(f"[Beagle] Connection from {addr}")
-                data = conn.recv(1024).decode().strip()
-                if data:
-                    print(f"[Beagle] Received: {data}")
-                    response = handle_command(data)
-                    conn.sendall(response.encode())
+            newline = self.buffer.find(b"\n", self.start, self.end)
+            if newline >= 0:
+                line = str(self.view[self.start:newline], "utf-8", "replace").strip()
+                self._consume(newline + 1)
+                return line
+            if self.end - self.start >= MAX_LINE_LENGTH:
+                raise LineTooLong()
+            if self.eof:
+                return None
+            await self._wait_for_data()
+            self.received = self.arrived
+
+    async def read_exactly(self, n):
+        """
+        Read exactly n bytes (binary mode, n <= RECV_BUFFER), or None if the
+        client has gone. Returns a view into the receive buffer that is
+        only valid until the next read. Sets received like read_line.
+        """
+        self.received = time.perf_counter()
+        while self.end - self.start < n:
+            if self.eof:
+                return None
+            await self._wait_for_data()
+            self.received = self.arrived
+        data = self.view[self.start:self.start + n]
+        self._consume(self.start + n)
+        return data
+
+    def send(self, text):
+        self.transport.write(text.encode())
+
+    def send_bytes(self, data):
+        self.transport.write(data)
+
+    def closed(self):
+        return self.transport.is_closing()
+
+    def buffered(self):
+        """Bytes written but not yet accepted by the socket"""
+        return self.transport.get_write_buffer_size()
+
+    def stop_telemetry(self):
+        if self.telemetry_task:
+            self.telemetry_task.cancel()
+            self.telemetry_task = None
+
+    def arm_heartbeat(self, timeout):
+        """Watch this session: any data from the client counts as a heartbeat; 0 disarms"""
+        self.heartbeat = timeout
+        self.last_heard = time.monotonic()
+        if timeout and not self.watchdog_task:
+            self.watchdog_task = asyncio.get_running_loop().create_task(watch_heartbeat(self))
+
+    def disarm_heartbeat(self):
+        self.heartbeat = 0.0
+        if self.watchdog_task:
+            self.watchdog_task.cancel()
+            self.watchdog_task = None
+
+    async def drain(self):
+        """Wait for the socket to take our replies; a client that stops reading is dropped"""
+        if self.transport.is_closing():
+            raise ConnectionResetError("Connection lost")
+        if self.write_paused:
+            self.drain_waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self.drain_waiter, SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise ConnectionResetError(f"replies unread for {SEND_TIMEOUT:g}s") from None
+            finally:
+                self.drain_waiter = None
+
+    def close(self):
+        self.transport.close()
+
+async def handle_client(conn):
+    """
+    Serve one persistent session. Every command is one newline-terminated
+    line and gets exactly one reply line, in the order received, so the
+    client may pipeline many commands without waiting for each reply.
+    Other clients are served concurrently on the same event loop.
+    """
+    global connection_count
+    connection_count += 1
+    metrics.counters["connections_total"] += 1
+    print(f"[Beagle] Connection from {conn.addr} ({connection_count} open)")
+    try:
+        while True:
+            command = await conn.read_line()
+            if command is None:
+                break
+            if not command:
+                continue
+            if command == "QUIT":
+                conn.disarm_heartbeat()
+                conn.send("BYE\n")
+                log_command(conn.session_id, cnc_journal.KIND_TEXT, command, "BYE", 0.0)
+                break
+            if command == "BINARY":
+                conn.send("OK BINARY\n")
+                log_command(conn.session_id, cnc_journal.KIND_TEXT, command, "OK BINARY", 0.0)
+                conn.binary = True
+                await serve_binary(conn)
+                break
+            try:
+                name, args = parse_command(command)
+                reply = None
+            except BadCommand as e:
+                name, args, reply = e.name, None, e.reply + "\n"
+            metrics.stages["parse"].observe(time.perf_counter() - conn.received)
+            if name != "PING":
+                print(f"[Beagle] Received: {command}")
+            if reply is None:
+                # Only the dispatch is measured: nothing else runs on the loop until it returns
+                dispatched = time.perf_counter()
+                blocks = sys.getallocatedblocks()
+                reply = dispatch(name, args, command, conn)
+                metrics.observe_alloc(sys.getallocatedblocks() - blocks)
+                metrics.stages["dispatch"].observe(time.perf_counter() - dispatched)
+            if isinstance(reply, MotionJob):
+                reply = await wait_job(reply) + "\n"
+            sending = time.perf_counter()
+            conn.send(reply)
+            error = reply.startswith(ERROR_REPLIES)
+            log_command(conn.session_id, cnc_journal.KIND_TEXT, command, reply.rstrip("\n"),
+                        sending - conn.received)
+            del command, reply
+            await conn.drain()
+            done = time.perf_counter()
+            metrics.stages["send"].observe(done - sending)
+            metrics.observe_command(name, done - conn.received, error)
+    except LineTooLong:
+        conn.send("LINE TOO LONG\n")
+        print(f"[Beagle] Dropping {conn.addr}: line exceeds {MAX_LINE_LENGTH} bytes")
+    except ConnectionError as e:
+        print(f"[Beagle] Connection from {conn.addr} lost: {e}")
+    finally:
+        if conn.heartbeat:
+            trip_watchdog(f"{conn.addr} dropped with its heartbeat armed")
+        conn.disarm_heartbeat()
+        connection_count -= 1
+        conn.stop_telemetry()
+        conn.close()
+        print(f"[Beagle] Connection from {conn.addr} closed")
+
+class JogChannel(asyncio.DatagramProtocol):
+    """
+    Low-latency jog channel on UDP. Each datagram is "JOG <seq> x y z", an
+    absolute target. Only the newest target matters: one jog job is in the
+    motion queue at a time and it reads the latest target when it starts,
+    and a newer target arriving mid-move stops that move at the next step
+    so the gantry heads straight for the new one. When the gantry settles
+    on the final target the server answers "DONE <seq> x y z".
+    """
+    def __init__(self):
+        self.transport = None
+        self.loop = None
+        self.target = None      # (seq, x, y, z) of the newest target
+        self.sender = None
+        self.last_seq = {}      # sender address -> highest seq seen
+        self.job = None         # jog job queued or running, if any
+        self.job_seq = None     # seq that job is heading for
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.loop = asyncio.get_running_loop()
+
+    def datagram_received(self, data, addr):
+        parts = data.split()
+        try:
+            if parts[0] != b"JOG" or len(parts) != 5:
+                raise ValueError(data)
+            seq = int(parts[1])
+            x, y, z = map(float, parts[2:])
+        except (ValueError, IndexError):
+            return
+        # Late or duplicated datagrams are dropped; a big jump back means the client restarted
+        last = self.last_seq.get(addr, -1)
+        if last - 1000 < seq <= last:
+            return
+        self.last_seq[addr] = seq
+        log_command(0, cnc_journal.KIND_TEXT, data.strip(), b"", 0.0)
+        self.target = (seq, x, y, z)
+        self.sender = addr
+
+        if self.job is None:
+            self.submit()
+        elif self.job.state == "RUNNING":
+            mc.request_stop()
+        # A queued job will pick up the new target when it starts
+
+    def submit(self):
+        try:
+            self.job = submit_motion("JOG_CHANNEL", self.run_jog)
+        except MotionRefused:
+            return  # The client keeps sending its target, so a later datagram retries
+        self.job.future.add_done_callback(lambda _: self.loop.call_soon_threadsafe(self.jog_done))
+
+    def run_jog(self):
+        # Runs on the motion thread
+        seq, x, y, z = self.target
+        self.job_seq = seq
+        return jog(x, y, z)
+
+    def jog_done(self):
+        job, self.job = self.job, None
+        if job.cancelled:
+            return  # Stopped by CANCEL or FLUSH; wait for the next target
+        if self.target[0] != self.job_seq:
+            self.submit()  # A newer target came in while moving
+        elif self.sender:
+            x, y, z = mc.get_current_position()
+            self.transport.sendto(f"DONE {self.job_seq} {x:.2f} {y:.2f} {z:.2f}".encode(), self.sender)
+
+async def flush_journal():
+    while journal:
+        await asyncio.sleep(cnc_journal.JOURNAL_FLUSH_INTERVAL)
+        journal.flush()
+
+async def serve(bring_up_hardware=True):
+    global journal, camera_feed
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(ClientConnection, HOST, PORT, reuse_address=True)
+    startup["bind"] = time.monotonic() - STARTED
+    await loop.create_datagram_endpoint(JogChannel, local_addr=(HOST, JOG_PORT))
+    if METRICS_PORT:
+        await metrics.serve_http(HOST, METRICS_PORT, lambda: (connection_count, queue_depth()))
+        print(f"[Beagle] Prometheus metrics on http://{HOST}:{METRICS_PORT}/metrics")
+    if FRAME_PORT:
+        import frame_stream  # OpenCV is only needed when streaming
+        camera_feed = await frame_stream.serve_http(HOST, FRAME_PORT)
+        print(f"[Beagle] Camera stream on http://{HOST}:{FRAME_PORT}/stream")
+    print(f"[Beagle] Listening on {HOST}:{PORT}, jog channel on UDP {JOG_PORT}...")
+    if JOURNAL_PATH:
+        journal = cnc_journal.Journal(JOURNAL_PATH)
+        asyncio.create_task(flush_journal())
+        print(f"[Beagle] Journaling commands to {JOURNAL_PATH}")
+    if bring_up_hardware:
+        submit_motion("STARTUP", bring_up, needs_home=False)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if journal:
+            journal.close()
+
+def main():
+    # Hardware init and homing happen in the background once the socket is up
+    print("[Beagle] Starting server...")
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("[Beagle] Shutting down")
+    finally:
+        motion_executor.shutdown(wait=True)
 
 if __name__ == "__main__":
     main()
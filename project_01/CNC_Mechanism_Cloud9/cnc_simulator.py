@@ -0,0 +1,115 @@
+# cnc_simulator.py — Run cnc_server without the hardware
+#
+# Serves the real cnc_server protocol on any Linux box. The GPIO module is
+# replaced by a simulated one, so motor_control runs its normal step loops
+# and motion takes as long as it would on the table: every step still
+# sleeps STEP_DELAY / Z_STEP_DELAY from motor_control's configuration.
+# Homing is simulated (no limit switches to find); the gantry starts
+# homed at (0, 0, 0) with the travel limits given on the command line.
+#
+#   python3 cnc_simulator.py [--port 9999] [--speed 1.0] [--travel 300 300]
+
+import argparse
+import asyncio
+import sys
+import time
+import types
+
+class SimulatedGPIO(types.ModuleType):
+    """Stand-in for Adafruit_BBIO.GPIO: outputs are counted, limit switches never trip"""
+    OUT, IN, HIGH, LOW, PUD_UP = 0, 1, 1, 0, 2
+
+    def __init__(self):
+        super().__init__("Adafruit_BBIO.GPIO")
+        self.writes = 0
+
+    def setup(self, pin, direction, pull_up_down=None):
+        pass
+
+    def output(self, pin, value):
+        self.writes += 1
+
+    def input(self, pin):
+        return self.HIGH  # Pulled up: not triggered
+
+    def cleanup(self):
+        pass
+
+class SimulatedClock:
+    """
+    time.sleep replacement for the step loops. Sleeping for each 0.3 ms
+    step on its own would mostly measure the OS timer, so requested delays
+    are added up and slept in chunks of at least MIN_SLEEP, which keeps
+    the total motion time close to the real one. speed > 1 runs faster.
+    """
+    MIN_SLEEP = 0.002
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.owed = 0.0
+
+    def sleep(self, seconds):
+        self.owed += seconds / self.speed
+        if self.owed >= self.MIN_SLEEP:
+            start = time.perf_counter()
+            time.sleep(self.owed)
+            self.owed -= time.perf_counter() - start
+
+def install_gpio():
+    """Put the simulated GPIO where motor_control and home_cnc import it from"""
+    gpio = SimulatedGPIO()
+    package = types.ModuleType("Adafruit_BBIO")
+    package.GPIO = gpio
+    sys.modules["Adafruit_BBIO"] = package
+    sys.modules["Adafruit_BBIO.GPIO"] = gpio
+    return gpio
+
+def main():
+    parser = argparse.ArgumentParser(description="Hardware-free cnc_server for testing clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--speed", type=float, default=1.0, help="Motion time divisor (1 = real time)")
+    parser.add_argument("--travel", type=float, nargs=2, default=(300.0, 300.0), metavar=("X_MM", "Y_MM"))
+    parser.add_argument("--quiet", action="store_true", help="Silence the per-command logging")
+    parser.add_argument("--journal", default=None, help="Journal commands to this file (off by default)")
+    args = parser.parse_args()
+
+    install_gpio()
+    import motor_control as mc
+    import home_cnc as hc
+    import cnc_server
+
+    if args.quiet:
+        cnc_server.print = mc.print = hc.print = lambda *a, **k: None
+
+    clock = SimulatedClock(args.speed)
+    mc.time = hc.time = types.SimpleNamespace(sleep=clock.sleep)
+    # cnc_server also sleeps on the motion thread (MOVE and PATH dwells), but
+    # needs the rest of the time module for its timestamps
+    cnc_server.time = types.SimpleNamespace(**vars(time))
+    cnc_server.time.sleep = clock.sleep
+
+    def simulated_home(motor_control):
+        motor_control.move_to_position(0.0, 0.0, 0.0)
+        motor_control.set_current_position(0.0, 0.0, 0.0)
+
+    hc.home_cnc = simulated_home
+    mc.set_limit_positions(0.0, args.travel[0], 0.0, args.travel[1])
+    mc.set_current_position(0.0, 0.0, 0.0)
+    cnc_server.homed = True
+    cnc_server.HOST = args.host
+    cnc_server.PORT = args.port
+    cnc_server.JOG_PORT = args.port - 1
+    cnc_server.JOURNAL_PATH = args.journal
+
+    print(f"[Sim] cnc_server simulator on {args.host}:{args.port}, speed x{args.speed:g}, "
+          f"travel {args.travel[0]:g} x {args.travel[1]:g} mm")
+    try:
+        asyncio.run(cnc_server.serve(bring_up_hardware=False))
+    except KeyboardInterrupt:
+        print("[Sim] Stopped")
+    finally:
+        cnc_server.motion_executor.shutdown(wait=False)
+
+if __name__ == "__main__":
+    main()
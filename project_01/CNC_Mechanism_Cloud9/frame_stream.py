@@ -0,0 +1,249 @@
+# frame_stream.py — JPEG frame stream of what the Beagle's camera sees
+#
+# CameraFeed runs VisionSystem's frame grabber while at least one viewer
+# is attached. Viewers never read the camera themselves; they encode the
+# grabber's latest frame at their own rate, and viewers asking for the
+# same view share one encode per frame. serve_http() answers
+#
+#   GET /stream?rate=5&quality=70&view=board&width=480   multipart MJPEG
+#   GET /frame.jpg?...                                   one JPEG
+#
+# view=full (default) is the whole camera frame, view=board the warped
+# bird's eye view of the board; roi=x,y,w,h crops the chosen view (clamped
+# to it; one entirely outside gets 400) and width scales it down. The stream opens in a browser, VLC or
+# cv2.VideoCapture("http://192.168.7.2:8080/stream").
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import cv2
+import numpy as np
+import cnc_metrics as metrics
+from vision_system import VisionSystem
+
+DEFAULT_RATE = 5.0      # Frames per second sent to a viewer
+MAX_RATE = 30.0
+DEFAULT_QUALITY = 70    # JPEG quality, 1-100
+DEFAULT_WIDTH = 640     # Frames wider than this are scaled down before encoding
+BOARD_SIZE = 480        # Side of the warped board view in pixels
+RATE_WINDOW = 50        # Frames averaged for the bytes/sec figure
+CALIBRATION_PATH = "calibration_data.npz"  # Board corners in the image, saved by CalibrationSystem
+
+# One encoder thread: the Beagle has one core, and cnc_metrics wants one writer
+encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+
+class StreamOptions:
+    """What one viewer asked for, parsed from the query string"""
+    def __init__(self, query: str):
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        self.rate = float(params.get("rate", DEFAULT_RATE))
+        self.quality = int(params.get("quality", DEFAULT_QUALITY))
+        self.view = params.get("view", "full")
+        self.width = int(params.get("width", DEFAULT_WIDTH))
+        self.roi = tuple(int(v) for v in params["roi"].split(",")) if "roi" in params else None
+        if not 0 < self.rate <= MAX_RATE:
+            raise ValueError(f"rate must be 0-{MAX_RATE:g}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("quality must be 1-100")
+        if self.view not in ("full", "board"):
+            raise ValueError("view must be full or board")
+        if self.width <= 0 or (self.roi and (len(self.roi) != 4 or min(self.roi[2:]) <= 0)):
+            raise ValueError("bad width or roi")
+
+    def key(self):
+        return self.view, self.quality, self.width, self.roi
+
+class CameraFeed:
+    """
+    The camera, shared by every viewer. seq is the newest frame the
+    grabber has; viewers wait for a newer one with wait_frame().
+    """
+    def __init__(self, vision: VisionSystem):
+        self.vision = vision
+        self.loop = None
+        self.viewers = 0
+        self.seq = 0
+        self.fresh = asyncio.Event()
+        self.opening = asyncio.Lock()
+        self.encoded = {}  # StreamOptions.key() -> (seq, jpeg); encoder thread only
+        self.sent = deque(maxlen=RATE_WINDOW)  # (time.monotonic(), bytes) of recent frames sent
+        vision.frame_listeners.append(self._frame_grabbed)
+
+    async def attach(self):
+        self.loop = asyncio.get_running_loop()
+        self.viewers += 1
+        async with self.opening:
+            if self.vision.cap is None or not self.vision.cap.isOpened():
+                # Opening the camera can take a while; keep the event loop serving
+                await self.loop.run_in_executor(None, self.vision.init_camera, False)
+        self.vision.start_grabber()
+
+    def detach(self):
+        self.viewers -= 1
+        if self.viewers == 0:
+            self.vision.stop_grabber()  # Nobody watches: leave the CPU to the motion thread
+
+    def _frame_grabbed(self, seq: int):
+        # Grabber thread
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._publish, seq)
+
+    def _publish(self, seq: int):
+        self.seq = seq
+        self.fresh.set()
+
+    async def wait_frame(self, after: int):
+        """Wait until the grabber has a frame newer than seq `after`"""
+        while self.seq <= after:
+            self.fresh.clear()
+            await self.fresh.wait()
+
+    def render(self, frame: np.ndarray, options: StreamOptions) -> np.ndarray:
+        if options.view == "board":
+            frame = self.vision.warp_board(frame, BOARD_SIZE)
+        if options.roi:
+            x, y, w, h = options.roi
+            height, width = frame.shape[:2]
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, width), min(y + h, height)
+            if x1 <= x0 or y1 <= y0:
+                raise ValueError(f"roi is outside the {width}x{height} view")
+            frame = frame[y0:y1, x0:x1]
+        if frame.shape[1] > options.width:
+            height = round(frame.shape[0] * options.width / frame.shape[1])
+            frame = cv2.resize(frame, (options.width, height), interpolation=cv2.INTER_AREA)
+        return frame
+
+    def encode(self, after: int, options: StreamOptions):
+        """
+        (seq, JPEG) of the grabber's latest frame in this view, encoded once
+        however many viewers want it (encoder thread)
+        """
+        frame = self.vision.latest_frame(after)
+        if frame is None:
+            raise ConnectionError("no frames from the camera")  # Ends this viewer's stream
+        key = options.key()
+        cached = self.encoded.get(key)
+        if cached and cached[0] == frame.seq:
+            return cached
+        start = time.perf_counter()
+        ok, jpeg = cv2.imencode(".jpg", self.render(frame.image, options),
+                                [cv2.IMWRITE_JPEG_QUALITY, options.quality])
+        if not ok:
+            raise ConnectionError("JPEG encoding failed")  # Ends this viewer's stream
+        data = jpeg.tobytes()
+        metrics.observe_encode(time.perf_counter() - start)
+        self.encoded[key] = (frame.seq, data)
+        return frame.seq, data
+
+    async def jpeg(self, after: int, options: StreamOptions):
+        """(seq, JPEG bytes) of the newest frame, once there is one newer than `after`"""
+        await self.wait_frame(after)
+        return await self.loop.run_in_executor(encoder, self.encode, after, options)
+
+    def observe_sent(self, nbytes: int):
+        self.sent.append((time.monotonic(), nbytes))
+        metrics.counters["frames_sent"] += 1
+        metrics.counters["frame_bytes"] += nbytes
+
+    def stats(self) -> dict:
+        """Viewers, frames captured, and bytes/sec and frames/sec over the last RATE_WINDOW frames sent"""
+        sent = list(self.sent)
+        span = time.monotonic() - sent[0][0] if len(sent) > 1 else 0.0
+        return {
+            "viewers": self.viewers,
+            "frames_grabbed": self.vision.frames_grabbed,
+            "frames_dropped": self.vision.frames_dropped,
+            "fps": round((len(sent) - 1) / span, 2) if span else 0.0,
+            "bytes_per_sec": round(sum(n for _, n in sent[1:]) / span) if span else 0,
+            "encode": metrics.frame_encode.summary(),
+        }
+
+def _part(data: bytes) -> bytes:
+    return (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+            + str(len(data)).encode() + b"\r\n\r\n" + data + b"\r\n")
+
+def _response(status: str, content_type: str, body: bytes) -> bytes:
+    return (f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nCache-Control: no-cache\r\n\r\n").encode() + body
+
+async def stream(feed: CameraFeed, options: StreamOptions, writer):
+    """Send frames at options.rate until the viewer goes away"""
+    loop = asyncio.get_running_loop()
+    addr = writer.get_extra_info("peername")
+    # The first frame comes before the headers, so a bad roi can still get a 400
+    seq, data = await feed.jpeg(0, options)
+    writer.write(b"HTTP/1.0 200 OK\r\nCache-Control: no-cache\r\n"
+                 b"Content-Type: multipart/x-mixed-replace; boundary=frame\r\n\r\n")
+    interval = 1.0 / options.rate
+    frames, total = 0, 0
+    started = due = loop.time()
+    print(f"[Beagle] Streaming {options.view} view to {addr} at {options.rate:g} fps, quality {options.quality}")
+    try:
+        while True:
+            if frames:
+                seq, data = await feed.jpeg(seq, options)
+            writer.write(_part(data))
+            await writer.drain()
+            feed.observe_sent(len(data))
+            frames += 1
+            total += len(data)
+            # Keep to the requested rate; a slow viewer just gets fewer frames
+            due = max(due + interval, loop.time())
+            await asyncio.sleep(due - loop.time())
+    finally:
+        elapsed = max(loop.time() - started, 1e-9)
+        print(f"[Beagle] Stream to {addr} closed: {frames} frames, "
+              f"{frames / elapsed:.1f} fps, {total / elapsed / 1024:.1f} KiB/s")
+
+def load_corners(vision: VisionSystem, path: str = CALIBRATION_PATH):
+    try:
+        vision.board_corners = np.load(path)["image_corners"].astype("float32")
+    except (OSError, KeyError) as e:
+        print(f"[Beagle] No board corners for the board view ({e})")
+
+async def serve_http(host: str, port: int, vision: VisionSystem = None):
+    """Start the frame endpoint; returns the CameraFeed behind it"""
+    if vision is None:
+        vision = VisionSystem()
+        load_corners(vision)
+    feed = CameraFeed(vision)
+
+    async def handle(reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            try:
+                url = urlsplit(request.split(b" ", 2)[1].decode())
+                options = StreamOptions(url.query)
+            except (ValueError, IndexError, UnicodeDecodeError) as e:
+                writer.write(_response("400 Bad Request", "text/plain", f"{e}\n".encode()))
+                return
+            if url.path not in ("/stream", "/frame.jpg"):
+                writer.write(_response("404 Not Found", "text/plain", b"Try /stream or /frame.jpg\n"))
+                return
+            if options.view == "board" and feed.vision.board_corners is None:
+                writer.write(_response("503 Service Unavailable", "text/plain", b"Board corners not calibrated\n"))
+                return
+            try:
+                await feed.attach()
+                if url.path == "/stream":
+                    await stream(feed, options, writer)
+                else:
+                    _, data = await feed.jpeg(0, options)
+                    writer.write(_response("200 OK", "image/jpeg", data))
+                    feed.observe_sent(len(data))
+                    await writer.drain()
+            except ValueError as e:
+                # Only render() raises it, before anything has been sent
+                writer.write(_response("400 Bad Request", "text/plain", f"{e}\n".encode()))
+            finally:
+                feed.detach()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    await asyncio.start_server(handle, host, port, reuse_address=True)
+    return feed
@@ -19,6 +19,7 @@ Y_MIN_LIMIT_PIN = "P1_34"   # Y-axis minimum (home) position limit switch
 Y_MAX_LIMIT_PIN = "P1_20"   # Y-axis maximum position limit switch
 Z_MIN_LIMIT_PIN = "P2_19"   # Z-axis minimum (home) position limit switch
 Z_MAX_LIMIT_PIN = "P2_33"   # Z-axis maximum position limit switch
+Y2_MIN_LIMIT_PIN = None     # Optional Y-MIN switch on the Y2 side, enables gantry squaring
 
 # Homing configuration
 HOMING_SPEED_FAST = 0.0002  # Faster approach speed (was 0.0005)
@@ -39,6 +40,8 @@ def init_limit_switches():
         Y_MIN_LIMIT_PIN, Y_MAX_LIMIT_PIN,
         Z_MIN_LIMIT_PIN, Z_MAX_LIMIT_PIN
     ]
+    if Y2_MIN_LIMIT_PIN is not None:
+        limit_pins.append(Y2_MIN_LIMIT_PIN)
     
     for pin in limit_pins:
         GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
@@ -789,7 +792,20 @@ def home_y_axes(motor_control):
         # This is the opposite of what we used for MAX
         print("Fast approach to Y-MIN - Moving in opposite direction from MAX")
         
-        while not check_limit_switch(Y_MIN_LIMIT_PIN) and steps_taken < max_steps:
+        if Y2_MIN_LIMIT_PIN is not None:
+            # Each Y motor stops on its own switch, which squares the gantry in this same pass
+            y1_taken, y2_taken = motor_control.move_y_motors(
+                max_steps, max_steps, False, HOMING_SPEED_FAST,
+                y1_stop=lambda: check_limit_switch(Y_MIN_LIMIT_PIN),
+                y2_stop=lambda: check_limit_switch(Y2_MIN_LIMIT_PIN)
+            )
+            steps_taken = max(y1_taken, y2_taken)
+            # Track position on the Y1 side, same sign convention as the loop below
+            motor_control.current_y += y1_taken / STEPS_PER_MM_Y
+            print(f"Y gantry squared: Y1 {y1_taken} steps, Y2 {y2_taken} steps "
+                  f"(skew corrected {abs(y1_taken - y2_taken) / STEPS_PER_MM_Y:.2f}mm)")
+        
+        while Y2_MIN_LIMIT_PIN is None and not check_limit_switch(Y_MIN_LIMIT_PIN) and steps_taken < max_steps:
             # Direction is HIGH to move toward MIN (opposite from MAX direction)
             GPIO.output(Y1_DIR_PIN, GPIO.HIGH)
             GPIO.output(Y2_DIR_PIN, GPIO.HIGH)
@@ -883,6 +899,140 @@ def home_y_axes(motor_control):
     
     return True
 
+# Repeatability probe configuration
+PROBE_TRIALS = 5                                      # Touches per switch per speed
+PROBE_SPEEDS = (0.0001, 0.0002, 0.0003, 0.0005, 0.001)  # Step delays to try (fastest first)
+PROBE_TARGET_SPREAD = 0.05                            # mm of trip-point spread we accept
+PROBE_BACKOFF = 3                                     # mm to back off between touches
+
+# For every switch: step pins, direction level that moves TOWARD the switch,
+# the direction level that moves away from it, and steps per mm for that axis.
+# Direction levels match the ones used by the homing routines above.
+PROBE_SWITCHES = {
+    'x_min': ((X_STEP_PIN,), (X_DIR_PIN,), GPIO.LOW, GPIO.HIGH, STEPS_PER_MM_X),
+    'x_max': ((X_STEP_PIN,), (X_DIR_PIN,), GPIO.HIGH, GPIO.LOW, STEPS_PER_MM_X),
+    'y_min': ((Y1_STEP_PIN, Y2_STEP_PIN), (Y1_DIR_PIN, Y2_DIR_PIN), GPIO.HIGH, GPIO.LOW, STEPS_PER_MM_Y),
+    'y_max': ((Y1_STEP_PIN, Y2_STEP_PIN), (Y1_DIR_PIN, Y2_DIR_PIN), GPIO.LOW, GPIO.HIGH, STEPS_PER_MM_Y),
+    'z_min': ((Z_STEP_PIN,), (Z_DIR_PIN,), GPIO.HIGH, GPIO.LOW, STEPS_PER_MM_Z),
+    'z_max': ((Z_STEP_PIN,), (Z_DIR_PIN,), GPIO.LOW, GPIO.HIGH, STEPS_PER_MM_Z),
+}
+
+def _probe_step(step_pins, dir_pins, level, steps, step_delay, limit_pin=None):
+    """
+    Step one axis a number of steps in the given direction level.
+    If limit_pin is given, stop as soon as that switch trips.
+    Returns the number of steps actually taken.
+    """
+    for pin in dir_pins:
+        GPIO.output(pin, level)
+    time.sleep(0.1)  # Direction signal settle time
+
+    for i in range(steps):
+        if limit_pin is not None and check_limit_switch(limit_pin):
+            return i
+        for pin in step_pins:
+            GPIO.output(pin, GPIO.HIGH)
+        time.sleep(step_delay)
+        for pin in step_pins:
+            GPIO.output(pin, GPIO.LOW)
+        time.sleep(step_delay)
+    return steps
+
+def probe_switch(name, trials=PROBE_TRIALS, speeds=PROBE_SPEEDS):
+    """
+    Touch one limit switch several times at each approach speed
+
+    The axis is first driven onto the switch, then for every trial it backs off
+    a fixed PROBE_BACKOFF and creeps back in, counting steps until the switch
+    trips. Since the backoff is an exact step count, any change in the trip
+    count is the repeatability error of the switch at that speed.
+
+    Returns a dict mapping step delay -> list of trip step counts,
+    or None if the switch could not be found.
+    """
+    step_pins, dir_pins, toward, away, steps_per_mm = PROBE_SWITCHES[name]
+    limit_pin = get_limit_pins()[name]
+    max_steps = int(MAX_HOMING_DISTANCE * steps_per_mm)
+    backoff_steps = int(PROBE_BACKOFF * steps_per_mm)
+
+    print(f"\n[Probe] Seeking {name} switch...")
+    taken = _probe_step(step_pins, dir_pins, toward, max_steps, HOMING_SPEED_SLOW, limit_pin)
+    if taken >= max_steps:
+        print(f"ERROR: {name} switch not found within safety limit")
+        return None
+
+    results = {}
+    for speed in speeds:
+        counts = []
+        for trial in range(trials):
+            _probe_step(step_pins, dir_pins, away, backoff_steps, HOMING_SPEED_SLOW)
+            # Allow twice the backoff so a missed trip can't run the axis away
+            count = _probe_step(step_pins, dir_pins, toward, backoff_steps * 2, speed, limit_pin)
+            if count >= backoff_steps * 2:
+                print(f"ERROR: {name} did not trip within {2 * PROBE_BACKOFF}mm at delay {speed}")
+                return None
+            counts.append(count)
+        results[speed] = counts
+        spread_mm = (max(counts) - min(counts)) / steps_per_mm
+        print(f"[Probe] {name} delay={speed:.4f}s trips={counts} spread={spread_mm:.4f}mm")
+
+    # Leave the axis clear of the switch
+    _probe_step(step_pins, dir_pins, away, int(HOMING_BACKOFF * steps_per_mm), HOMING_SPEED_SLOW)
+    return results
+
+def repeatability_probe(motor_control, switches=None, trials=PROBE_TRIALS,
+                        speeds=PROBE_SPEEDS, target_spread=PROBE_TARGET_SPREAD):
+    """
+    Run the repeatability probe on each limit switch and report the
+    fastest approach speed that still meets target_spread (mm).
+
+    Position tracking is not updated while probing, so the machine
+    is re-homed at the end.
+
+    Returns a dict mapping switch name -> fastest acceptable step delay
+    (None if no tested speed met the target).
+    """
+    if switches is None:
+        # Z first, like home_cnc, so the magnet is clear of the board
+        switches = ['z_min', 'z_max', 'x_min', 'x_max', 'y_min', 'y_max']
+
+    print(f"Repeatability probe: {trials} trials, target spread {target_spread}mm")
+    best = {}
+    worst_spread = {}  # step delay -> worst spread (mm) seen on any switch
+    for name in switches:
+        steps_per_mm = PROBE_SWITCHES[name][4]
+        results = probe_switch(name, trials, speeds)
+        best[name] = None
+        if results is None:
+            continue
+        # Smaller delay is a faster approach
+        for speed in sorted(results):
+            counts = results[speed]
+            spread = (max(counts) - min(counts)) / steps_per_mm
+            worst_spread[speed] = max(worst_spread.get(speed, 0.0), spread)
+            if best[name] is None and spread <= target_spread:
+                best[name] = speed
+
+    print("\n=== Repeatability summary ===")
+    for name, speed in best.items():
+        if speed is None:
+            print(f"  {name}: no tested speed met {target_spread}mm")
+        else:
+            print(f"  {name}: fastest approach delay {speed:.4f}s")
+
+    if worst_spread:
+        passing = [speed for speed in sorted(worst_spread) if worst_spread[speed] <= target_spread]
+        if passing and None not in best.values():
+            # The homing routines use one approach speed for every axis
+            print(f"Suggested HOMING_SPEED_FAST = {passing[0]} (currently {HOMING_SPEED_FAST})")
+        most_repeatable = min(sorted(worst_spread), key=lambda speed: worst_spread[speed])
+        print(f"Suggested HOMING_SPEED_SLOW = {most_repeatable} (currently {HOMING_SPEED_SLOW}), "
+              f"spread {worst_spread[most_repeatable]:.4f}mm")
+
+    print("Re-homing after probe...")
+    home_cnc(motor_control)
+    return best
+
 # Export the limit switch pin definitions for use in movement functions
 def get_limit_pins():
     """Return all limit switch pin definitions"""
@@ -902,4 +1052,25 @@ def get_z_limits(mc=None):
     global Z_MIN, Z_MAX
     Z_MIN = mc.Z_RELEASE_POSITION
     Z_MAX = mc.Z_MAX_HEIGHT
-    return Z_MIN, Z_MAX
\ No newline at end of file
+    return Z_MIN, Z_MAX
+
+if __name__ == "__main__":
+    import argparse
+    import motor_control as mc
+
+    parser = argparse.ArgumentParser(description="Home the CNC or probe limit switch repeatability")
+    parser.add_argument("--probe", action="store_true", help="run the limit switch repeatability probe")
+    parser.add_argument("--trials", type=int, default=PROBE_TRIALS, help="touches per switch per speed")
+    parser.add_argument("--target", type=float, default=PROBE_TARGET_SPREAD, help="acceptable spread in mm")
+    parser.add_argument("--speeds", type=float, nargs="+", default=PROBE_SPEEDS, help="step delays to try")
+    parser.add_argument("--switches", nargs="+", choices=list(PROBE_SWITCHES), help="switches to probe")
+    args = parser.parse_args()
+
+    mc.init_motors()
+    init_limit_switches()
+    try:
+        home_cnc(mc)
+        if args.probe:
+            repeatability_probe(mc, args.switches, args.trials, args.speeds, args.target)
+    finally:
+        mc.cleanup()
@@ -29,6 +29,9 @@ current_z = 0
 
 check_limit_switch = None
 
+# Set from another thread to abort the move in progress (see request_stop)
+stop_requested = False
+
 # Store global XY limit positions
 x_min_position = 0.0
 x_max_position = 0.0
@@ -48,6 +51,15 @@ def set_limit_check_function(check_function):
     check_limit_switch = check_function
     print("Limit switch checking enabled")
 
+def request_stop():
+    """Ask the running move to stop at its next step; position tracking stays correct"""
+    global stop_requested
+    stop_requested = True
+
+def clear_stop():
+    global stop_requested
+    stop_requested = False
+
 def set_limit_positions(x_min, x_max, y_min, y_max):
     global x_min_position, x_max_position, y_min_position, y_max_position
     x_min_position = x_min
@@ -58,12 +70,18 @@ def set_limit_positions(x_min, x_max, y_min, y_max):
 def get_limit_positions():
     return x_min_position, x_max_position, y_min_position, y_max_position
 
+def is_within_limits(x_mm, y_mm):
+    return x_min_position <= x_mm <= x_max_position and y_min_position <= y_mm <= y_max_position
+
 def move_x_axis(steps, direction, step_delay=STEP_DELAY):
     global current_x
     print(f"Moving X-axis {'forward' if direction else 'backward'} {steps} steps")
     GPIO.output(X_DIR_PIN, GPIO.HIGH if direction else GPIO.LOW)
     time.sleep(0.01)
     for i in range(steps):
+        if stop_requested:
+            print(f"X-axis stopped at step {i}")
+            break
         if check_limit_switch:
             if (direction and check_limit_switch('x_max')) or (not direction and check_limit_switch('x_min')):
                 print(f"X-axis limit switch triggered at step {i}")
@@ -74,25 +92,88 @@ def move_x_axis(steps, direction, step_delay=STEP_DELAY):
         time.sleep(step_delay)
         current_x += (1 / STEPS_PER_MM_X) if direction else -(1 / STEPS_PER_MM_X)
 
-def move_y_axes(steps, direction, step_delay=STEP_DELAY):
-    global current_y
-    print(f"Moving Y-axes {'forward' if direction else 'backward'} {steps} steps")
+def move_y_motors(y1_steps, y2_steps, direction, step_delay=STEP_DELAY,
+                  stop=None, y1_stop=None, y2_stop=None):
+    """
+    Step the two Y motors with independent step counts in one timing loop.
+    The motor with fewer steps has its pulses spread evenly over the move
+    (Bresenham style) so the gantry racks smoothly rather than in a jump.
+
+    stop ends the move for both motors, y1_stop/y2_stop end it for one motor
+    only (used for squaring the gantry against per-side switches).
+    Returns the number of steps each motor actually took as (y1, y2).
+    """
     # FIXED DIRECTION INVERSION FOR Y
     GPIO.output(Y1_DIR_PIN, GPIO.LOW if direction else GPIO.HIGH)
     GPIO.output(Y2_DIR_PIN, GPIO.LOW if direction else GPIO.HIGH)
     time.sleep(0.01)
-    for i in range(steps):
-        if check_limit_switch:
-            if (direction and check_limit_switch('y_max')) or (not direction and check_limit_switch('y_min')):
-                print(f"Y-axis limit switch triggered at step {i}")
-                break
-        GPIO.output(Y1_STEP_PIN, GPIO.HIGH)
-        GPIO.output(Y2_STEP_PIN, GPIO.HIGH)
+
+    # Common case: both motors move together, keep the loop as tight as possible
+    if y1_steps == y2_steps and y1_stop is None and y2_stop is None:
+        for i in range(y1_steps):
+            if stop_requested or (stop and stop()):
+                return i, i
+            GPIO.output(Y1_STEP_PIN, GPIO.HIGH)
+            GPIO.output(Y2_STEP_PIN, GPIO.HIGH)
+            time.sleep(step_delay)
+            GPIO.output(Y1_STEP_PIN, GPIO.LOW)
+            GPIO.output(Y2_STEP_PIN, GPIO.LOW)
+            time.sleep(step_delay)
+        return y1_steps, y1_steps
+
+    total = max(y1_steps, y2_steps)
+    y1_taken = y2_taken = 0
+    y1_acc = y2_acc = 0
+    y1_done = y1_steps == 0
+    y2_done = y2_steps == 0
+    for i in range(total):
+        if stop_requested or (stop and stop()):
+            break
+        if not y1_done and y1_stop and y1_stop():
+            y1_done = True
+        if not y2_done and y2_stop and y2_stop():
+            y2_done = True
+        if y1_done and y2_done:
+            break
+
+        y1_acc += y1_steps
+        y2_acc += y2_steps
+        pulse_y1 = y1_acc >= total
+        pulse_y2 = y2_acc >= total
+        if pulse_y1:
+            y1_acc -= total
+        if pulse_y2:
+            y2_acc -= total
+        pulse_y1 = pulse_y1 and not y1_done
+        pulse_y2 = pulse_y2 and not y2_done
+
+        if pulse_y1:
+            GPIO.output(Y1_STEP_PIN, GPIO.HIGH)
+        if pulse_y2:
+            GPIO.output(Y2_STEP_PIN, GPIO.HIGH)
         time.sleep(step_delay)
-        GPIO.output(Y1_STEP_PIN, GPIO.LOW)
-        GPIO.output(Y2_STEP_PIN, GPIO.LOW)
+        if pulse_y1:
+            GPIO.output(Y1_STEP_PIN, GPIO.LOW)
+            y1_taken += 1
+            y1_done = y1_taken >= y1_steps
+        if pulse_y2:
+            GPIO.output(Y2_STEP_PIN, GPIO.LOW)
+            y2_taken += 1
+            y2_done = y2_taken >= y2_steps
         time.sleep(step_delay)
-        current_y += (1 / STEPS_PER_MM_Y) if direction else -(1 / STEPS_PER_MM_Y)
+    return y1_taken, y2_taken
+
+def move_y_axes(steps, direction, step_delay=STEP_DELAY):
+    global current_y
+    print(f"Moving Y-axes {'forward' if direction else 'backward'} {steps} steps")
+    stop = None
+    if check_limit_switch:
+        limit_name = 'y_max' if direction else 'y_min'
+        stop = lambda: check_limit_switch(limit_name)
+    taken, _ = move_y_motors(steps, steps, direction, step_delay, stop=stop)
+    if taken < steps:
+        print(f"Y-axis {'stopped' if stop_requested else 'limit switch triggered'} at step {taken}")
+    current_y += (taken / STEPS_PER_MM_Y) if direction else -(taken / STEPS_PER_MM_Y)
 
 def move_z_axis(steps, direction, step_delay=Z_STEP_DELAY):
     global current_z
@@ -100,6 +181,9 @@ def move_z_axis(steps, direction, step_delay=Z_STEP_DELAY):
     GPIO.output(Z_DIR_PIN, GPIO.LOW if direction else GPIO.HIGH)
     time.sleep(0.01)
     for i in range(steps):
+        if stop_requested:
+            print(f"Z-axis stopped at step {i}")
+            break
         if check_limit_switch:
             if (direction and check_limit_switch('z_max')) or (not direction and check_limit_switch('z_min')):
                 print(f"Z-axis limit switch triggered at step {i}")
@@ -136,10 +220,13 @@ def move_to_position(x_mm, y_mm, z_mm=None):
     if not z_is_low and lowering_z:
         move_z_axis(int(abs(current_z - z_mm) * STEPS_PER_MM_Z), False)
 
-    if x_steps > 0:
+    if x_steps > 0 and not stop_requested:
         move_x_axis(x_steps, x_direction)
-    if y_steps > 0:
+    if y_steps > 0 and not stop_requested:
         move_y_axes(y_steps, y_direction)
+    if stop_requested:
+        print("[Beagle] move_to_position stopped early")
+        return
 
     if z_mm is not None:
         if z_mm > current_z:
@@ -0,0 +1,182 @@
+# replay_journal.py — Feed a cnc_server journal back to a server
+#
+# Every recorded session is replayed on its own connection (session 0,
+# the UDP jog channel, as datagrams); session ids restart with every
+# server run, so sessions are keyed by run and id. Replay follows the
+# recorded schedule or goes as fast as the server answers. Afterwards the recorded server-side reply
+# times are shown next to the replayed round trips per command (the
+# difference is mostly network and client time), and replies whose status word
+# differs (OK vs ERROR and so on) are counted, which makes two builds or
+# the simulator and the real table easy to compare.
+#
+#   python3 replay_journal.py cnc_journal.bin --host 127.0.0.1 [--max-speed] [--speed 2]
+
+import argparse
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict
+import cnc_journal
+import cnc_protocol as proto
+
+class ReplaySession:
+    """One recorded session replayed over TCP, switching to frames after BINARY"""
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = b""
+
+    def _read_exactly(self, n):
+        while len(self.buffer) < n:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.buffer += data
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def text(self, line):
+        self.sock.sendall(line.encode() + b"\n")
+        while True:
+            while b"\n" not in self.buffer:
+                data = self.sock.recv(4096)
+                if not data:
+                    raise ConnectionError("server closed the connection")
+                self.buffer += data
+            reply, self.buffer = self.buffer.split(b"\n", 1)
+            reply = reply.decode(errors="replace").strip()
+            if not reply.startswith("EVT "):
+                return reply
+
+    def frame(self, request):
+        self.sock.sendall(request)
+        while True:
+            header = self._read_exactly(proto.HEADER.size)
+            opcode, length = proto.HEADER.unpack(header)
+            reply = header + (self._read_exactly(length) if length else b"")
+            if opcode != proto.OP_EVENT_DONE:
+                return reply
+
+    def close(self):
+        self.sock.close()
+
+def status_word(kind, reply):
+    """What the replay compares: first word of a text reply, opcode and result of a frame"""
+    if kind == cnc_journal.KIND_TEXT:
+        return reply.split()[0] if reply else ""
+    if reply and reply[0] == proto.OP_RESULT and len(reply) > proto.HEADER.size:
+        return (reply[0], reply[proto.HEADER.size])
+    return reply[:1]
+
+def command_name(record):
+    if record.kind == cnc_journal.KIND_TEXT:
+        return record.command.split()[0] if record.command else ""
+    return f"BINARY_{record.command[0]:02X}"
+
+class Replay:
+    def __init__(self, records, host, port, jog_port, speed):
+        self.records = records
+        self.host = host
+        self.port = port
+        self.jog_port = jog_port
+        self.speed = speed  # None replays as fast as possible
+        self.lock = threading.Lock()
+        self.recorded = defaultdict(list)
+        self.replayed = defaultdict(list)
+        self.mismatches = []
+        self.failures = 0
+
+    def _wait_until(self, start, record):
+        if self.speed:
+            delay = (record.time - self.records[0].time) / self.speed - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+    def _run_session(self, records, start):
+        if records[0].session == 0:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            for record in records:
+                self._wait_until(start, record)
+                sock.sendto(record.command.encode(), (self.host, self.jog_port))
+            sock.close()
+            return
+        try:
+            session = ReplaySession(self.host, self.port)
+        except OSError:
+            with self.lock:
+                self.failures += 1
+            return
+        try:
+            for record in records:
+                self._wait_until(start, record)
+                sent = time.perf_counter()
+                if record.kind == cnc_journal.KIND_TEXT:
+                    reply = session.text(record.command)
+                else:
+                    reply = session.frame(record.command)
+                elapsed = time.perf_counter() - sent
+                name = command_name(record)
+                with self.lock:
+                    self.recorded[name].append(record.seconds)
+                    self.replayed[name].append(elapsed)
+                    if status_word(record.kind, reply) != status_word(record.kind, record.reply):
+                        self.mismatches.append((record.session, record.command, record.reply, reply))
+                if record.command in ("QUIT", proto.frame(proto.OP_QUIT)):
+                    break
+        except (OSError, ConnectionError):
+            with self.lock:
+                self.failures += 1
+        finally:
+            session.close()
+
+    def run(self):
+        sessions = defaultdict(list)  # (server run, session id) -> records
+        run = 0
+        for record in self.records:
+            if record.kind == cnc_journal.KIND_RUN:
+                run += 1
+                continue
+            sessions[run, record.session].append(record)
+        start = time.monotonic()
+        threads = [threading.Thread(target=self._run_session, args=(records, start), daemon=True)
+                   for records in sessions.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - start
+
+def report(replay, elapsed):
+    total = sum(len(samples) for samples in replay.replayed.values())
+    print(f"Replayed {total} commands from {len(replay.records)} records in {elapsed:.2f}s, "
+          f"{len(replay.mismatches)} status mismatches, {replay.failures} failed sessions")
+    print(f"{'command':14s} {'count':>6s} {'server ms':>12s} {'replay rtt ms':>14s}")
+    for name in sorted(replay.replayed):
+        recorded = statistics.median(replay.recorded[name]) * 1e3
+        replayed = statistics.median(replay.replayed[name]) * 1e3
+        print(f"{name:14s} {len(replay.replayed[name]):6d} {recorded:12.3f} {replayed:14.3f}")
+    for session, command, recorded, replayed in replay.mismatches[:20]:
+        print(f"  session {session}: {command!r} recorded {recorded!r} replayed {replayed!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a cnc_server command journal")
+    parser.add_argument("journal", help="Journal file; its rotated files are replayed first")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--jog-port", type=int, default=None, help="UDP jog port (default port - 1)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Schedule speed-up (1 = as recorded)")
+    parser.add_argument("--max-speed", action="store_true", help="Ignore the recorded schedule")
+    args = parser.parse_args()
+
+    records = [record for path in cnc_journal.journal_files(args.journal)
+               for record in cnc_journal.read_journal(path)]
+    if not records:
+        print("Journal is empty")
+        return
+    replay = Replay(records, args.host, args.port,
+                    args.jog_port or args.port - 1, None if args.max_speed else args.speed)
+    report(replay, replay.run())
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
 import cv2
 import numpy as np
+import threading
 import time
-from typing import Tuple, List, Dict, Optional
+from typing import Tuple, List, Dict, Optional, NamedTuple, Callable
+
+# Piece thresholds on the mean BGR colour of a square's centre region
+DARK_PIECE_MAX = 80         # Channel 2 below this: black piece
+RED_PIECE_RANGE = (150, 180)  # Channel 0 strictly inside this: red piece
+
+FRAME_RING = 3  # Preallocated frames the grabber thread cycles through
+
+class Frame(NamedTuple):
+    image: np.ndarray
+    timestamp: float  # time.monotonic() when the grabber received it
+    seq: int          # Counts every frame grabbed since the camera opened
 
 class VisionSystem:
     """
@@ -14,9 +26,25 @@ class VisionSystem:
         self.calibration_data = None
         self.board_corners = None
         self.squares = 8  # Standard checkers board size
+        self._warp_cache = {}  # Output size -> (corners, remap maps, output buffer)
+        
+        # Background grabber (see start_grabber)
+        self._ring = []
+        self._latest = None         # (ring slot, timestamp, seq) of the freshest frame
+        self._fresh = threading.Condition()
+        self._grabbing = False
+        self._grab_thread = None
+        self._read = True           # Whether the freshest frame has been handed out
+        self.frame_listeners: List[Callable[[int], None]] = []  # Called with seq from the grabber thread
+        self.frames_grabbed = 0
+        self.frames_dropped = 0     # Camera frames lost: gaps longer than 1.5 frame intervals
+        self.frames_skipped = 0     # Grabbed but replaced by a newer one before anybody asked
     
-    def init_camera(self) -> bool:
-        """Initialize the camera"""
+    def init_camera(self, grab: bool = True) -> bool:
+        """
+        Initialize the camera
+        With grab=True a background thread keeps reading it (start_grabber)
+        """
         try:
             self.cap = cv2.VideoCapture(2)  # Use the default camera
             if not self.cap.isOpened():
@@ -28,6 +56,8 @@ class VisionSystem:
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
             
             print("Camera initialized successfully")
+            if grab:
+                self.start_grabber()
             return True
         except Exception as e:
             print(f"Error initializing camera: {e}")
@@ -35,14 +65,114 @@ class VisionSystem:
     
     def release_camera(self) -> None:
         """Release the camera resources"""
+        self.stop_grabber(wait=True)
         if self.cap is not None:
             self.cap.release()
             cv2.destroyAllWindows()
             print("Camera released")
     
+    def start_grabber(self) -> None:
+        """
+        Read the camera continuously on a background thread, into a ring of
+        FRAME_RING preallocated frames. The camera's own queue is drained as
+        fast as it fills, so capture_frame() gets the newest frame straight
+        away instead of a stale buffered one a frame interval later.
+        """
+        with self._fresh:
+            self._grabbing = True
+            if self._grab_thread is None:
+                self._grab_thread = threading.Thread(target=self._grab_loop, daemon=True)
+                self._grab_thread.start()
+    
+    def stop_grabber(self, wait: bool = False) -> None:
+        """Stop the grabber thread; capture_frame() reads the camera directly again"""
+        with self._fresh:
+            self._grabbing = False
+            thread = self._grab_thread
+        if wait and thread is not None:
+            thread.join()
+    
+    def grabbing(self) -> bool:
+        return self._grab_thread is not None
+    
+    def _grab_loop(self) -> None:
+        # Grabber thread
+        try:
+            self._grab_frames()
+        except Exception as e:
+            print(f"Error: Frame grabber stopped: {e}")
+        finally:
+            with self._fresh:
+                # A grabber started after this one returned is not ours to clear
+                if self._grab_thread is threading.current_thread():
+                    self._grab_thread = None
+                    self._grabbing = False
+    
+    def _grab_frames(self) -> None:
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap is not None else 0
+        interval = 1.0 / fps if fps and fps > 0 else None
+        slot = 0
+        previous = None  # Timestamp of the last frame in this run; pauses in between are not drops
+        while True:
+            with self._fresh:
+                if not self._grabbing or self.cap is None:
+                    self._grab_thread = None
+                    return
+            # Never the slot being handed out: with the latest frame in slot n,
+            # the grabber only writes slot n + 1 until it can publish that
+            slot = (slot + 1) % FRAME_RING
+            buffer = self._ring[slot] if len(self._ring) == FRAME_RING else None
+            ok, image = self.cap.read(buffer)
+            timestamp = time.monotonic()
+            if not ok:
+                time.sleep(0.05)
+                continue
+            if len(self._ring) < FRAME_RING:
+                self._ring = [image] + [np.empty_like(image) for _ in range(FRAME_RING - 1)]
+                slot = 0
+            elif image is not buffer:
+                self._ring[slot] = image  # Frame size changed; the new array becomes the slot
+            if previous is not None and interval and timestamp - previous > 1.5 * interval:
+                self.frames_dropped += round((timestamp - previous) / interval) - 1
+            previous = timestamp
+            with self._fresh:
+                if self._latest is not None and not self._read:
+                    self.frames_skipped += 1
+                self.frames_grabbed += 1
+                self._latest = (slot, timestamp, self.frames_grabbed)
+                self._read = False
+                self._fresh.notify_all()
+            for listener in list(self.frame_listeners):
+                try:
+                    listener(self.frames_grabbed)
+                except Exception as e:
+                    # One broken subscriber must not stop capture for the rest
+                    print(f"Error: Dropping frame listener {listener!r}: {e}")
+                    self.frame_listeners.remove(listener)
+    
+    def latest_frame(self, after: int = 0, timeout: float = 1.0, copy: bool = True) -> Optional[Frame]:
+        """
+        Freshest frame from the grabber with its timestamp and sequence
+        number, waiting up to timeout for one newer than seq `after`.
+        With copy=False the image is the grabber's own buffer, overwritten
+        FRAME_RING - 1 frames later.
+        """
+        with self._fresh:
+            if not self._fresh.wait_for(lambda: self._latest is not None and self._latest[2] > after, timeout):
+                return None
+            slot, timestamp, seq = self._latest
+            self._read = True
+            image = self._ring[slot].copy() if copy else self._ring[slot]
+        return Frame(image, timestamp, seq)
+    
     def capture_frame(self) -> Optional[np.ndarray]:
         """Capture a frame from the camera"""
-        if self.cap is not None and self.cap.isOpened():
+        if self.grabbing():
+            frame = self.latest_frame()
+            if frame is not None:
+                return frame.image
+            print("Error: No frame from the grabber")
+        elif self.cap is not None and self.cap.isOpened():
             ret, frame = self.cap.read()
             if ret:
                 return frame
@@ -105,6 +235,44 @@ class VisionSystem:
         
         return rect
     
+    def _warp_maps(self, size: int):
+        """
+        remap() lookup maps from the board corners to a size x size view
+        Built once per corner set and size, since the corners rarely change
+        """
+        corners = np.asarray(self.board_corners, dtype="float32")
+        cached = self._warp_cache.get(size)
+        if cached is not None and np.array_equal(cached[0], corners):
+            return cached
+        dst = np.array([[0, 0], [size, 0], [size, size], [0, size]], dtype="float32")
+        M = cv2.getPerspectiveTransform(corners, dst)
+        
+        # Source pixel for every output pixel (what warpPerspective works out per call)
+        ys, xs = np.indices((size, size), dtype=np.float64)
+        src = np.stack([xs, ys, np.ones_like(xs)], axis=-1) @ np.linalg.inv(M).T
+        map_x = (src[..., 0] / src[..., 2]).astype(np.float32)
+        map_y = (src[..., 1] / src[..., 2]).astype(np.float32)
+        map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)  # Fixed point, faster to remap
+        
+        cached = (corners.copy(), map1, map2, {})
+        self._warp_cache[size] = cached
+        return cached
+    
+    def warp_board(self, frame: np.ndarray, size: int = 800) -> Optional[np.ndarray]:
+        """
+        Bird's eye view of the board, size x size pixels
+        Returns None until the board corners are known. The result is a
+        buffer reused by the next call with the same size, so copy it to keep it.
+        """
+        if self.board_corners is None:
+            return None
+        _, map1, map2, buffers = self._warp_maps(size)
+        shape = (size, size) + frame.shape[2:]
+        warped = buffers.get((shape, frame.dtype))
+        if warped is None:
+            warped = buffers[(shape, frame.dtype)] = np.empty(shape, dtype=frame.dtype)
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=warped)
+    
     def detect_pieces(self, frame: np.ndarray) -> Dict[Tuple[int, int], str]:
         """
         Detect checker pieces on the board
@@ -116,42 +284,47 @@ class VisionSystem:
                 print("Error: Board corners not detected")
                 return {}
         
-        # Create perspective transform to get a bird's eye view
+        # Bird's eye view of the board
         width = 800
-        height = 800
-        dst = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype="float32")
-        M = cv2.getPerspectiveTransform(self.board_corners, dst)
-        warped = cv2.warpPerspective(frame, M, (width, height))
+        warped = self.warp_board(frame, width)
         
-        # Create a dictionary to store piece locations
-        pieces = {}
-        square_size = width // self.squares
-        
-        # Process each square on the board
-        for row in range(self.squares):
-            for col in range(self.squares):
-                # Calculate square boundaries
-                x = col * square_size
-                y = row * square_size
-                
-                # Extract the square
-                square = warped[y:y+square_size, x:x+square_size]
-                
-                # Check if a piece is present in this square
-                piece_type = self.identify_piece(square)
-                if piece_type:
-                    pieces[(col, row)] = piece_type
+        # Classify all 64 squares at once
+        labels = self.classify_squares(warped)
+        rows, cols = np.nonzero(labels)
+        return {(int(col), int(row)): str(labels[row, col]) for row, col in zip(rows, cols)}
+    
+    def square_means(self, warped: np.ndarray) -> np.ndarray:
+        """
+        Mean colour of the centre region of every square, shape (8, 8, 3) by [row, col]
+        Same values identify_piece computes square by square: the sums are
+        exact integers, then divided once
+        """
+        square_size = warped.shape[0] // self.squares
+        lo, hi = square_size // 4, 3 * square_size // 4
+        board = warped[:square_size * self.squares, :square_size * self.squares]
         
-        return pieces
+        # Sum the centre rows of each square row first (contiguous, so fast), then the centre columns
+        rows = board.reshape(self.squares, square_size, board.shape[1], -1)[:, lo:hi]
+        row_dtype = np.uint16 if (hi - lo) * 255 <= 0xFFFF else np.uint32
+        row_sums = rows.sum(axis=1, dtype=row_dtype)
+        sums = row_sums.reshape(self.squares, self.squares, square_size, -1)[:, :, lo:hi].sum(axis=2, dtype=np.uint32)
+        return sums / ((hi - lo) * (hi - lo))
+    
+    def classify_squares(self, warped: np.ndarray) -> np.ndarray:
+        """
+        Piece on every square of a warped board in one pass
+        Returns an (8, 8) array by [row, col] of 'B', 'R' or '' (empty)
+        """
+        avg = self.square_means(warped)
+        black = avg[..., 2] < DARK_PIECE_MAX
+        red = (RED_PIECE_RANGE[0] < avg[..., 0]) & (avg[..., 0] < RED_PIECE_RANGE[1])
+        return np.where(black, 'B', np.where(red, 'R', ''))
     
     def identify_piece(self, square: np.ndarray) -> Optional[str]:
         """
         Identify if the square contains a piece and determine its type
         Returns 'R' for red pieces, 'B' for black pieces, or None if no piece
         """
-        # Convert to HSV color space
-        hsv = cv2.cvtColor(square, cv2.COLOR_BGR2HSV)
-        
         # Calculate the average color in the center of the square
         center_region = square[square.shape[0]//4:3*square.shape[0]//4, 
                                square.shape[1]//4:3*square.shape[1]//4]
@@ -161,9 +334,9 @@ class VisionSystem:
         
         # Check brightness (V in HSV) to see if there's a piece
         # Pieces should have different brightness than empty squares
-        if avg_color[2] < 80:  # Dark piece (black)
+        if avg_color[2] < DARK_PIECE_MAX:  # Dark piece (black)
             return 'B'
-        elif 150 < avg_color[0] < 180:  # Red piece (checking Hue)
+        elif RED_PIECE_RANGE[0] < avg_color[0] < RED_PIECE_RANGE[1]:  # Red piece (checking Hue)
             return 'R'
         
         # No piece detected
@@ -217,9 +390,6 @@ class VisionSystem:
             # Draw board grid
             width = 800
             height = 800
-            dst = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype="float32")
-            M = cv2.getPerspectiveTransform(self.board_corners, dst)
-            warped = cv2.warpPerspective(frame, M, (width, height))
             
             # Create a visualization of the board with detected pieces
             board_viz = np.zeros((width, height, 3), dtype=np.uint8)
@@ -0,0 +1,138 @@
+# async_remote_motor_control.py — asyncio Client for Windows Side
+#
+# Same protocol as remote_motor_control, but nothing blocks the event loop:
+# jogs are sent as JOG_TO_ASYNC and awaited through the server's EVT DONE
+# push, so the connection stays free for get_position() and other queries
+# while the gantry is moving.
+
+import asyncio
+from collections import deque
+from remote_motor_control import POCKETBEAGLE_IP, PORT, parse_telemetry
+
+class AsyncCNCClient:
+    def __init__(self, host: str = POCKETBEAGLE_IP, port: int = PORT):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self._replies = deque()  # Futures waiting for reply lines, in send order
+        self._jobs = {}          # job id -> future resolved by EVT DONE
+        self._early_done = {}    # EVT DONE results that arrived before submit_jog saw its ACK
+        self._reader_task = None
+        self.on_event = None     # Optional callback(line) for other pushed events
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self.writer:
+            self.writer.write(b"QUIT\n")
+            self.writer.close()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                line = line.decode().strip()
+                if line.startswith("EVT DONE "):
+                    # The result itself may contain spaces ("ERROR <message>", "OK MOVE ...")
+                    job_id, rest = line[len("EVT DONE "):].split(" ", 1)
+                    result, seconds = rest.rsplit(" ", 1)
+                    future = self._jobs.pop(int(job_id), None)
+                    if future is None:
+                        self._early_done[int(job_id)] = (result, float(seconds))
+                    elif not future.done():
+                        future.set_result((result, float(seconds)))
+                elif line.startswith("EVT "):
+                    if self.on_event:
+                        self.on_event(line)
+                elif self._replies:
+                    future = self._replies.popleft()
+                    if not future.done():
+                        future.set_result(line)
+        finally:
+            error = ConnectionError("cnc_server closed the connection")
+            for future in list(self._replies) + list(self._jobs.values()):
+                if not future.done():
+                    future.set_exception(error)
+            self._replies.clear()
+            self._jobs.clear()
+
+    async def command(self, cmd: str) -> str:
+        """Send a command and await its reply; many may be in flight at once"""
+        future = asyncio.get_running_loop().create_future()
+        # Writing and queueing the future with no await in between keeps
+        # replies matched to commands in order
+        self._replies.append(future)
+        self.writer.write((cmd + "\n").encode())
+        return await future
+
+    async def submit_jog(self, x: float, y: float, z: float) -> asyncio.Future:
+        """
+        Queue a jog on the Beagle. Returns as soon as it is accepted, with a
+        future that resolves to (result, seconds) when the move finishes.
+        """
+        reply = await self.command(f"JOG_TO_ASYNC {x:.2f} {y:.2f} {z:.2f}")
+        if not reply.startswith("ACK"):
+            raise RuntimeError(f"Jog refused: {reply}")
+        job_id = int(reply.split()[1])
+        future = asyncio.get_running_loop().create_future()
+        if job_id in self._early_done:
+            future.set_result(self._early_done.pop(job_id))
+        else:
+            self._jobs[job_id] = future
+        return future
+
+    async def jog_to(self, x: float, y: float, z: float):
+        """Jog and wait for the move to finish without blocking the event loop"""
+        done = await self.submit_jog(x, y, z)
+        return await done
+
+    async def get_position(self):
+        response = await self.command("GET_POSITION")
+        if response.startswith("POS"):
+            _, x, y, z = response.split()
+            return float(x), float(y), float(z)
+        return None
+
+    async def get_xy_limits(self):
+        response = await self.command("GET_XY_LIMITS")
+        try:
+            x_min, x_max, y_min, y_max = map(float, response.split(","))
+            return x_min, x_max, y_min, y_max
+        except ValueError:
+            return None
+
+    async def move_piece(self, x1: int, y1: int, x2: int, y2: int) -> str:
+        # MOVE replies only once the piece is placed, so it gets its own
+        # connection rather than holding up queries on this one
+        async with AsyncCNCClient(self.host, self.port) as mover:
+            return await mover.command(f"MOVE {x1} {y1} {x2} {y2}")
+
+    async def subscribe(self, rate: float, callback):
+        """Have telemetry pushed at `rate` Hz; callback receives parsed samples"""
+        self.on_event = lambda line: callback(parse_telemetry(line)) if line.startswith("EVT TELEM") else None
+        return await self.command(f"SUBSCRIBE {rate}")
+
+async def demo(host: str = POCKETBEAGLE_IP):
+    """Track the position while a jog is in progress"""
+    async with AsyncCNCClient(host) as cnc:
+        done = await cnc.submit_jog(50, 50, 2)
+        while not done.done():
+            print("[Async] Position during jog:", await cnc.get_position())
+            await asyncio.sleep(0.1)
+        print("[Async] Jog finished:", done.result())
+
+if __name__ == "__main__":
+    asyncio.run(demo())
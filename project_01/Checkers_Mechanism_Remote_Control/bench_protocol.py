@@ -0,0 +1,73 @@
+# bench_protocol.py — Text vs binary protocol micro-benchmark
+#
+# Measures round-trip latency and client CPU per message for GET_POSITION
+# over a text session and a binary session against a running cnc_server,
+# plus the pure encode/decode cost of each format without the network.
+#
+#   python bench_protocol.py [host] [--count N]
+
+import argparse
+import statistics
+import time
+import cnc_protocol as proto
+import remote_motor_control as rmc
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def time_round_trips(call, count):
+    """Run call() count times; returns (latencies in seconds, CPU seconds per call)"""
+    for _ in range(min(50, count)):  # warm up
+        call()
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies, (time.process_time() - cpu_start) / count
+
+def report(name, latencies, cpu):
+    print(f"{name:8s} p50={statistics.median(latencies) * 1e6:8.1f}us "
+          f"p99={percentile(latencies, 99) * 1e6:8.1f}us "
+          f"mean={statistics.mean(latencies) * 1e6:8.1f}us "
+          f"cpu/msg={cpu * 1e6:6.1f}us")
+
+def bench_codec(count):
+    """Encode a jog request and decode a position reply, with no socket involved"""
+    reply_text = "POS 123.45 67.89 10.00"
+    reply_frame = proto.frame(proto.OP_POSITION, proto.XYZ.pack(123.45, 67.89, 10.0))
+
+    start = time.process_time()
+    for _ in range(count):
+        (f"JOG_TO {123.45:.2f} {67.89:.2f} {10.0:.2f}" + "\n").encode()
+        _, x, y, z = reply_text.split()
+        float(x), float(y), float(z)
+    text_cpu = (time.process_time() - start) / count
+
+    start = time.process_time()
+    for _ in range(count):
+        proto.frame(proto.OP_JOG, proto.XYZ.pack(123.45, 67.89, 10.0))
+        proto.HEADER.unpack_from(reply_frame)
+        proto.XYZ.unpack_from(reply_frame, proto.HEADER.size)
+    binary_cpu = (time.process_time() - start) / count
+
+    print(f"codec    text={text_cpu * 1e6:.2f}us/msg binary={binary_cpu * 1e6:.2f}us/msg")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text and binary CNC protocol latency")
+    parser.add_argument("host", nargs="?", default=rmc.POCKETBEAGLE_IP)
+    parser.add_argument("--port", type=int, default=rmc.PORT)
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"GET_POSITION round trips to {args.host}:{args.port}, {args.count} each")
+    with rmc.CNCSession(args.host, args.port) as session:
+        report("text", *time_round_trips(lambda: rmc.get_position(session), args.count))
+    with rmc.BinarySession(args.host, args.port) as session:
+        report("binary", *time_round_trips(session.get_position, args.count))
+    bench_codec(args.count * 10)
+
+if __name__ == "__main__":
+    main()
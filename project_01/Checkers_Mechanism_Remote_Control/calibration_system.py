@@ -152,27 +152,40 @@ class CalibrationSystem:
     def _keyboard_jog_loop(self, label: str):
         print(f"\n[Jog] Use w/a/s/d to move XY, q/e for Z. Press Enter when at {label} corner.")
         jog_step = 1.0  # mm
+        moves = {'w': (0, jog_step, 0), 's': (0, -jog_step, 0),
+                 'a': (-jog_step, 0, 0), 'd': (jog_step, 0, 0),
+                 'q': (0, 0, jog_step), 'e': (0, 0, -jog_step)}
         x, y, z = rmc.get_position()
+        jog = rmc.JogChannel()
 
-        while True:
-            print(f"  Current position: X={x:.2f}, Y={y:.2f}, Z={z:.2f}   (Press Enter to confirm)")
-            key = msvcrt.getch()
-            try:
-                key = key.decode('utf-8').lower()
-            except UnicodeDecodeError:
-                print("[Jog] Non-standard key pressed — ignored")
-                continue
-
-            if key == '\r':  # Enter key
-                break
-            elif key == 'w': y += jog_step
-            elif key == 's': y -= jog_step
-            elif key == 'a': x -= jog_step
-            elif key == 'd': x += jog_step
-            elif key == 'q': z += jog_step
-            elif key == 'e': z -= jog_step
-
-            rmc.jog_to(x, y, z)
+        try:
+            while True:
+                print(f"  Target position: X={x:.2f}, Y={y:.2f}, Z={z:.2f}   (Press Enter to confirm)")
+                keys = [msvcrt.getch()]
+                # Fold every key already waiting (held-down repeat) into one target
+                while msvcrt.kbhit():
+                    keys.append(msvcrt.getch())
+
+                confirmed = False
+                for key in keys:
+                    try:
+                        key = key.decode('utf-8').lower()
+                    except UnicodeDecodeError:
+                        print("[Jog] Non-standard key pressed — ignored")
+                        continue
+                    if key == '\r':  # Enter key
+                        confirmed = True
+                        break
+                    dx, dy, dz = moves.get(key, (0, 0, 0))
+                    x, y, z = x + dx, y + dy, z + dz
+
+                jog.set_target(x, y, z)
+                if confirmed:
+                    # Let the gantry finish before the caller reads the position
+                    jog.wait_settled()
+                    break
+        finally:
+            jog.close()
 
     def load(self):
         try:
@@ -1,5 +1,4 @@
 # cnc_checkers.py — Main VS Code Controller
-import time
 from vision_system import VisionSystem
 from board_system import BoardSystem
 from calibration_system import CalibrationSystem
@@ -12,8 +11,17 @@ class CNCCheckers:
         self.calibration = CalibrationSystem(self.vision, self.board)
 
         print("[System] Initializing...")
+        try:
+            rmc.start_state_mirror()
+        except (OSError, ConnectionError) as e:
+            print("[System] No state mirror, position reads go to the Beagle:", e)
+        try:
+            rmc.start_heartbeat()
+        except (OSError, ConnectionError) as e:
+            print("[System] No heartbeat, the Beagle's watchdog stays off:", e)
         self.vision.init_camera()
         self.calibration.load()
+        self.sync_board()
         print("[System] Ready.")
 
     def move_piece(self, start, end):
@@ -24,23 +32,22 @@ class CNCCheckers:
             print("[Move] Invalid square")
             return
 
-        start_x, start_y = self.board.board_to_cnc(x1, y1)
-        end_x, end_y = self.board.board_to_cnc(x2, y2)
-
-        Z_ATTACH = 10.0
-        Z_PLACE  = 2.0
-        Z_LOW    = 0.0
-
-        rmc.jog_to(start_x, start_y, Z_LOW)
-        rmc.jog_to(start_x, start_y, Z_ATTACH)
-        time.sleep(0.2)
-
-        rmc.jog_to(end_x, end_y, Z_ATTACH)
-        rmc.jog_to(end_x, end_y, Z_PLACE)
-        time.sleep(0.2)
+        # The Beagle runs the whole pick-and-place as one request
+        timings = rmc.move_piece(x1, y1, x2, y2)
+        if timings is None:
+            return
+        print("[Move] Piece moved. " + ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items()))
 
-        rmc.jog_to(end_x, end_y, Z_LOW)
-        print("[Move] Piece moved.")
+    def sync_board(self):
+        """Send the calibrated board geometry to the Beagle so MOVE uses it"""
+        x0, y0 = self.board.board_to_cnc(0, 0)
+        try:
+            response = rmc.set_board(x0, y0, self.board.square_size_x, self.board.square_size_y)
+        except (OSError, ConnectionError) as e:
+            print("[System] Failed to send board geometry, the Beagle is unreachable:", e)
+            return
+        if response != "OK":
+            print("[System] Failed to send board geometry:", response)
 
     def menu(self):
         while True:
@@ -52,7 +59,8 @@ class CNCCheckers:
 
             choice = input("Select: ")
             if choice == "1":
-                self.calibration.run()
+                if self.calibration.run():
+                    self.sync_board()
             elif choice == "2":
                 try:
                     x1 = int(input("Start X: "))
@@ -71,6 +79,8 @@ class CNCCheckers:
             elif choice == "4":
                 print("Exiting...")
                 self.vision.release_camera()
+                rmc.stop_state_mirror()
+                rmc.stop_heartbeat()
                 break
             else:
                 print("Invalid option")
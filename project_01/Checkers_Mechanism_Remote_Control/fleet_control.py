@@ -0,0 +1,167 @@
+# fleet_control.py — Drive several CNC tables from one Windows process
+#
+# Each table has its own PocketBeagle running cnc_server. FleetController
+# keeps a pooled CNCClient per table and runs requests on all of them at
+# once from a thread pool, so one slow or dead table never holds up the
+# others.
+#
+#   python fleet_control.py table1=192.168.7.2 table2=192.168.8.2
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import remote_motor_control as rmc
+
+HEALTH_TIMEOUT = 2.0  # Seconds a health check may take before the table counts as down
+CONNECT_TIMEOUT = 1.0  # Seconds per connection attempt to a table
+CONNECT_RETRIES = 2    # Attempts before a table counts as unreachable, so a dead one frees its worker quickly
+
+class Machine:
+    """One table: its client plus running counters, updated under lock from pool workers"""
+    def __init__(self, name: str, host: str, port: int = rmc.PORT):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.client = rmc.CNCClient(host, port, timeout=CONNECT_TIMEOUT, retries=CONNECT_RETRIES)
+        self.commands = 0
+        self.errors = 0
+        self.busy_time = 0.0     # Seconds spent waiting on replies
+        self.last_latency = None
+        self.last_seen = None    # time.monotonic() of the last good reply
+        self.health = {}
+        self.lock = threading.Lock()
+
+    def command(self, cmd: str) -> str:
+        start = time.perf_counter()
+        reply = None
+        try:
+            reply = self.client.command(cmd)
+            return reply
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.busy_time += elapsed
+                self.commands += 1
+                if reply is None or reply.startswith(("ERROR", "BAD", "UNKNOWN", "BUSY")):
+                    self.errors += 1
+                if reply is not None:
+                    self.last_latency = elapsed
+                    self.last_seen = time.monotonic()
+
+class FleetController:
+    """
+    Several cnc_server endpoints behind one interface. `machines` maps a
+    table name to "host" or "host:port".
+    """
+    def __init__(self, machines: dict):
+        self.machines = {}
+        for name, address in machines.items():
+            host, _, port = address.partition(":")
+            self.machines[name] = Machine(name, host, int(port) if port else rmc.PORT)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, len(self.machines)),
+                                       thread_name_prefix="fleet")
+        self.started = time.monotonic()
+
+    def run(self, action, names=None) -> dict:
+        """
+        Call action(machine) on every table (or just `names`) in parallel.
+        Returns name -> result, or the exception that table raised.
+        """
+        targets = [self.machines[name] for name in (names or self.machines)]
+        futures = {m.name: self.pool.submit(action, m) for m in targets}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def broadcast(self, cmd: str, names=None) -> dict:
+        """Send one command to every table; returns name -> reply (or exception)"""
+        return self.run(lambda m: m.command(cmd), names)
+
+    def home_all(self, names=None) -> dict:
+        return self.broadcast("HOME", names)
+
+    def set_board_all(self, x0: float, y0: float, square_x: float, square_y: float, names=None) -> dict:
+        """Send the same board geometry (e.g. from one calibration) to every table"""
+        return self.broadcast(f"SET_BOARD {x0:.3f} {y0:.3f} {square_x:.3f} {square_y:.3f}", names)
+
+    def positions(self, names=None) -> dict:
+        """name -> (x, y, z)"""
+        def position(machine):
+            _, x, y, z = machine.command("GET_POSITION").split()
+            return float(x), float(y), float(z)
+        return self.run(position, names)
+
+    def _check(self, machine: Machine) -> dict:
+        try:
+            stats = json.loads(machine.command("STATS"))
+            machine.health = {
+                "up": True,
+                "latency_ms": round(machine.last_latency * 1000, 2),
+                "homed": stats.get("homed"),
+                "queue": stats["queue_depth"],
+                "duty_cycle": stats["motion_duty_cycle"],
+                "server_errors": stats["counters"]["errors_total"],
+            }
+        except Exception as e:
+            machine.health = {"up": False, "error": str(e)}
+        machine.health["reconnects"] = machine.client.reconnects
+        return machine.health
+
+    def health(self, names=None) -> dict:
+        """Ask every table for STATS; returns name -> health dict"""
+        targets = [self.machines[name] for name in (names or self.machines)]
+        futures = {m.name: self.pool.submit(self._check, m) for m in targets}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=HEALTH_TIMEOUT)
+            except Exception:
+                results[name] = {"up": False, "error": "health check timed out"}
+        return results
+
+    def throughput(self) -> dict:
+        """Commands per second for the whole fleet and per table since start"""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        per_machine = {m.name: m.commands / elapsed for m in self.machines.values()}
+        return {
+            "elapsed": elapsed,
+            "commands": sum(m.commands for m in self.machines.values()),
+            "errors": sum(m.errors for m in self.machines.values()),
+            "total_per_sec": sum(per_machine.values()),
+            "per_machine": per_machine,
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for machine in self.machines.values():
+            machine.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def print_health(fleet: FleetController):
+    for name, health in fleet.health().items():
+        if health["up"]:
+            print(f"[Fleet] {name:10s} up   {health['latency_ms']:7.2f}ms homed={health['homed']} "
+                  f"queue={health['queue']} duty={health['duty_cycle']:.1%} reconnects={health['reconnects']}")
+        else:
+            print(f"[Fleet] {name:10s} DOWN {health['error']}")
+    totals = fleet.throughput()
+    print(f"[Fleet] {totals['commands']} commands, {totals['errors']} errors, "
+          f"{totals['total_per_sec']:.1f} cmd/s over {totals['elapsed']:.1f}s")
+
+if __name__ == "__main__":
+    tables = dict(arg.split("=", 1) for arg in sys.argv[1:]) or {"table1": rmc.POCKETBEAGLE_IP}
+    with FleetController(tables) as fleet:
+        print_health(fleet)
+        for name, position in fleet.positions().items():
+            print(f"[Fleet] {name} position: {position}")
@@ -0,0 +1,135 @@
+# load_test.py — Drive a cnc_server (or cnc_simulator) with many clients
+#
+# Each client is a thread with its own persistent session that sends
+# commands picked at random from a weighted mix for a fixed time, then
+# the run reports throughput, p50/p95/p99 latency and error rate per
+# command. On a plain Linux box start the simulator first:
+#
+#   python3 ../CNC_Mechanism_Cloud9/cnc_simulator.py --quiet --speed 50 &
+#   python3 load_test.py 127.0.0.1 --clients 8 --duration 10 \
+#       --mix GET_POSITION=70,STATUS=10,JOG_TO_ASYNC=10,QUEUE_STATUS=10
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+import remote_motor_control as rmc
+
+ERROR_PREFIXES = ("ERROR", "BAD", "UNKNOWN", "BUSY")
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def parse_mix(text):
+    """"GET_POSITION=70,JOG_TO=30" -> ([names], [weights])"""
+    names, weights = [], []
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        names.append(name.strip().upper())
+        weights.append(float(weight or 1))
+    return names, weights
+
+class Results:
+    """Latencies and error counts per command, merged from every client"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.failures = 0  # Connections that broke mid-run
+
+    def merge(self, latencies, errors):
+        with self.lock:
+            for name, samples in latencies.items():
+                self.latencies[name].extend(samples)
+            for name, count in errors.items():
+                self.errors[name] += count
+
+class LoadClient(threading.Thread):
+    def __init__(self, host, port, mix, limits, stop_at, results, seed):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.names, self.weights = mix
+        self.limits = limits
+        self.stop_at = stop_at
+        self.results = results
+        self.random = random.Random(seed)
+        self.last_job = 1
+
+    def build(self, name):
+        """Concrete command line for a command name in the mix"""
+        if name in ("JOG_TO", "JOG_TO_ASYNC"):
+            x_min, x_max, y_min, y_max = self.limits
+            x = self.random.uniform(x_min, x_max)
+            y = self.random.uniform(y_min, y_max)
+            return f"{name} {x:.2f} {y:.2f} 0.00"
+        if name == "STATUS":
+            return f"STATUS {self.last_job}"
+        return name
+
+    def run(self):
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        try:
+            with rmc.CNCSession(self.host, self.port) as session:
+                while time.monotonic() < self.stop_at:
+                    name = self.random.choices(self.names, self.weights)[0]
+                    line = self.build(name)
+                    start = time.perf_counter()
+                    reply = session.command(line)
+                    latencies[name].append(time.perf_counter() - start)
+                    if reply.startswith(ERROR_PREFIXES):
+                        errors[name] += 1
+                    elif reply.startswith("ACK"):
+                        self.last_job = int(reply.split()[1])
+                    session.events.clear()  # EVT DONE pushes are not needed here
+        except (OSError, ConnectionError):
+            with self.results.lock:
+                self.results.failures += 1
+        self.results.merge(latencies, errors)
+
+def report(results, elapsed):
+    total = sum(len(samples) for samples in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f"{total} commands in {elapsed:.1f}s = {total / elapsed:.1f} cmd/s, "
+          f"{errors} errors ({errors / max(total, 1):.2%}), {results.failures} broken connections")
+    print(f"{'command':14s} {'count':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+    for name, samples in sorted(results.latencies.items()):
+        print(f"{name:14s} {len(samples):7d} {percentile(samples, 50) * 1e3:9.2f} "
+              f"{percentile(samples, 95) * 1e3:9.2f} {percentile(samples, 99) * 1e3:9.2f} "
+              f"{results.errors[name]:7d}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test cnc_server with many clients")
+    parser.add_argument("host", nargs="?", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=rmc.PORT)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--mix", default="GET_POSITION=80,STATUS=10,JOG_TO_ASYNC=10",
+                        help="Weighted command mix, NAME=weight,...")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with rmc.CNCSession(args.host, args.port) as session:
+        # Clients would all be refused before homing, and the XY limits are
+        # only known once it is done, so wait for it first
+        if not rmc.wait_homed(session=session):
+            sys.exit("cnc_server did not finish homing")
+        limits = rmc.get_xy_limits(session)
+
+    mix = parse_mix(args.mix)
+    results = Results()
+    start = time.monotonic()
+    clients = [LoadClient(args.host, args.port, mix, limits, start + args.duration, results, args.seed + i)
+               for i in range(args.clients)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    report(results, time.monotonic() - start)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,839 @@
 # remote_motor_control.py — Client for Windows Side
 
+import asyncio
+import json
+import queue
 import socket
+import threading
+import time
+import cnc_protocol as proto
 
 POCKETBEAGLE_IP = '192.168.7.2'
 PORT = 9999
+JOG_PORT = 9998
+JOG_SEND_INTERVAL = 0.02  # Seconds between jog datagrams; keypresses in between are merged
 
-def send_command(cmd: str) -> str:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((POCKETBEAGLE_IP, PORT))
-        s.sendall((cmd + "\n").encode())
-        return s.recv(1024).decode().strip()
+POOL_SIZE = 4            # Idle keep-alive connections kept per client
+CONNECT_RETRIES = 5      # Connection attempts before giving up
+RETRY_BACKOFF = 0.1      # First retry delay in seconds, doubled each attempt
+MAX_BACKOFF = 2.0
+REQUEST_TIMEOUT = 2.0    # Seconds to wait for a reply before the Beagle counts as hung
+MOTION_TIMEOUT = 300.0   # Same for requests that wait on motion (MOTION_REQUESTS)
+MOTION_REQUESTS = {"JOG_TO", "MOVE", "PATH", "HOME"}
+HEARTBEAT_INTERVAL = 0.2  # Seconds between PINGs on the heartbeat connection
+HEARTBEAT_TIMEOUT = 0.6   # Silence after which either end gives the other up
+MIRROR_RATE = 20.0      # Hz the Beagle samples state for the local mirror
+MIRROR_MAX_AGE = 1.0    # Seconds the mirror may go without an update before reads use the network
+MIRROR_WAIT = 0.05      # Seconds a read waits for the push that follows a motion command
 
-def jog_to(x: float, y: float, z: float):
+# Commands that are safe to resend if the connection drops mid-request
+IDEMPOTENT_COMMANDS = {"GET_POSITION", "GET_XY_LIMITS", "STATUS", "JOG_TO", "SET_BOARD"}
+
+class CNCSession:
+    """
+    Persistent connection to cnc_server. Commands are newline-terminated and
+    every command gets one reply line back in order, so several commands can
+    be sent before reading any replies (pipelining).
+
+    Lines starting with "EVT " are pushed by the server on its own (e.g. a
+    JOG_TO_ASYNC finishing); they are set aside in self.events rather than
+    being taken as replies.
+
+    Every reply has a deadline (request_timeout()); when it passes, or the
+    heartbeat loses the Beagle first, the read raises and the session
+    should be dropped, since a late reply would answer the wrong command.
+    """
+    def __init__(self, host: str = POCKETBEAGLE_IP, port: int = PORT, timeout: float = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self._buffer = b""
+        self.events = []
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = b""
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.sendall(b"QUIT\n")
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, cmd: str):
+        """Send one command without waiting for its reply"""
+        self.sock.sendall((cmd + "\n").encode())
+
+    def _recv(self, deadline: float = None) -> bytes:
+        """
+        recv() that gives up at deadline (time.monotonic()). While a
+        heartbeat runs, long waits wake up every HEARTBEAT_TIMEOUT to check
+        it, so a dead Beagle is noticed long before a motion deadline.
+        """
+        while True:
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                raise TimeoutError("cnc_server did not answer in time")
+            if _heartbeat:
+                wait = HEARTBEAT_TIMEOUT if wait is None else min(wait, HEARTBEAT_TIMEOUT)
+            self.sock.settimeout(wait)
+            try:
+                data = self.sock.recv(4096)
+            except socket.timeout:
+                if _heartbeat and not _heartbeat.alive:
+                    raise ConnectionError("cnc_server missed its heartbeat")
+                continue
+            if not data:
+                raise ConnectionError("cnc_server closed the connection")
+            return data
+
+    def _read_line(self, deadline: float = None) -> str:
+        while b"\n" not in self._buffer:
+            self._buffer += self._recv(deadline)
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode().strip()
+
+    def read_reply(self, timeout: float = REQUEST_TIMEOUT) -> str:
+        """Read the next reply line, buffering partial reads"""
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._read_line(deadline)
+            if not line.startswith("EVT "):
+                return line
+            self.events.append(line)
+
+    def wait_done(self, job_id: int, timeout: float = MOTION_TIMEOUT) -> str:
+        """
+        Block until the server reports job_id finished; returns the EVT DONE
+        line. Raises TimeoutError if it has not come within timeout seconds.
+        """
+        prefix = f"EVT DONE {job_id} "
+        deadline = time.monotonic() + timeout
+        while True:
+            for event in self.events:
+                if event.startswith(prefix):
+                    self.events.remove(event)
+                    return event
+            line = self._read_line(deadline)
+            if line.startswith("EVT "):
+                self.events.append(line)
+
+    def command(self, cmd: str, timeout: float = None) -> str:
+        self.send(cmd)
+        return self.read_reply(timeout or request_timeout(cmd))
+
+    def pipeline(self, cmds) -> list:
+        """Send all commands in one write, then collect the replies in order"""
+        self.sock.sendall("".join(cmd + "\n" for cmd in cmds).encode())
+        return [self.read_reply(request_timeout(cmd)) for cmd in cmds]
+
+def request_timeout(cmd: str) -> float:
+    """Reply deadline for a command: motion may take minutes, anything else is quick"""
+    name = cmd.split(None, 1)[0] if cmd.strip() else ""
+    return MOTION_TIMEOUT if name in MOTION_REQUESTS else REQUEST_TIMEOUT
+
+class BinarySession(CNCSession):
+    """
+    Session that switches to the compact binary framing after connecting.
+    Jog, position and status go as struct-packed frames; anything else can
+    still be sent as text through command().
+    """
+    def connect(self):
+        super().connect()
+        self.send("BINARY")
+        reply = self.read_reply()
+        if reply != "OK BINARY":
+            raise ConnectionError(f"cnc_server refused binary mode: {reply}")
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.sendall(proto.frame(proto.OP_QUIT))
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def _read_exactly(self, n: int, deadline: float = None) -> bytes:
+        while len(self._buffer) < n:
+            self._buffer += self._recv(deadline)
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def read_frame(self, timeout: float = REQUEST_TIMEOUT):
+        """Return the next reply frame as (opcode, payload); events go to self.events"""
+        deadline = time.monotonic() + timeout
+        while True:
+            opcode, length = proto.HEADER.unpack(self._read_exactly(proto.HEADER.size, deadline))
+            payload = self._read_exactly(length, deadline) if length else b""
+            if opcode != proto.OP_EVENT_DONE:
+                return opcode, payload
+            self.events.append(proto.JOB_STATE.unpack(payload))
+
+    def request(self, opcode: int, payload: bytes = b"", timeout: float = REQUEST_TIMEOUT):
+        self.sock.sendall(proto.frame(opcode, payload))
+        return self.read_frame(timeout)
+
+    def command(self, cmd: str, timeout: float = None) -> str:
+        _, payload = self.request(proto.OP_TEXT, cmd.encode(), timeout or request_timeout(cmd))
+        return payload.decode()
+
+    def pipeline(self, cmds) -> list:
+        self.sock.sendall(b"".join(proto.frame(proto.OP_TEXT, cmd.encode()) for cmd in cmds))
+        return [self.read_frame(request_timeout(cmd))[1].decode() for cmd in cmds]
+
+    def jog(self, x: float, y: float, z: float) -> bool:
+        _, payload = self.request(proto.OP_JOG, proto.XYZ.pack(x, y, z), MOTION_TIMEOUT)
+        return payload[0] == proto.RESULT_OK
+
+    def jog_async(self, x: float, y: float, z: float) -> int:
+        opcode, payload = self.request(proto.OP_JOG_ASYNC, proto.XYZ.pack(x, y, z))
+        return proto.JOB_ID.unpack(payload)[0] if opcode == proto.OP_ACK else None
+
+    def get_position(self):
+        _, payload = self.request(proto.OP_GET_POSITION)
+        return proto.XYZ.unpack(payload)
+
+    def status(self, job_id: int):
+        """Return (state code, exec seconds) for a job, see cnc_protocol.STATE_*"""
+        _, payload = self.request(proto.OP_STATUS, proto.JOB_ID.pack(job_id))
+        _, state, exec_time = proto.JOB_STATE.unpack(payload)
+        return state, exec_time
+
+    def wait_done(self, job_id: int, timeout: float = MOTION_TIMEOUT):
+        """
+        Block until job_id finishes; returns (job id, result code, exec
+        seconds). Raises TimeoutError if it has not within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            for event in self.events:
+                if event[0] == job_id:
+                    self.events.remove(event)
+                    return event
+            opcode, length = proto.HEADER.unpack(self._read_exactly(proto.HEADER.size, deadline))
+            payload = self._read_exactly(length, deadline) if length else b""
+            if opcode == proto.OP_EVENT_DONE:
+                self.events.append(proto.JOB_STATE.unpack(payload))
+
+def parse_telemetry(line: str) -> dict:
+    """
+    Turn "EVT TELEM t=.. pos=x,y,z z=UP limits=x_min,.. queue=n dropped=n"
+    into a dict with position as a tuple and limits as a list
+    """
+    fields = dict(item.split("=", 1) for item in line.split()[2:])
+    return {
+        "time": float(fields["t"]),
+        "position": tuple(float(v) for v in fields["pos"].split(",")),
+        "z_state": fields["z"],
+        "limits": [] if fields["limits"] == "-" else fields["limits"].split(","),
+        "queue": int(fields["queue"]),
+        "dropped": int(fields["dropped"]),
+    }
+
+def stream_telemetry(rate: float = 10.0, host: str = POCKETBEAGLE_IP, port: int = PORT):
+    """
+    Generator yielding telemetry dicts pushed by the Beagle at `rate` Hz.
+    Uses its own connection so it never mixes with command replies.
+    """
+    with CNCSession(host, port) as session:
+        reply = session.command(f"SUBSCRIBE {rate}")
+        if not reply.startswith("OK"):
+            raise ConnectionError(f"Subscribe refused: {reply}")
+        while True:
+            line = session._read_line()
+            if line.startswith("EVT TELEM"):
+                yield parse_telemetry(line)
+
+async def atelemetry(rate: float = 10.0, host: str = POCKETBEAGLE_IP, port: int = PORT):
+    """asyncio version of stream_telemetry: `async for sample in atelemetry(20): ...`"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"SUBSCRIBE {rate}\n".encode())
+        reply = (await reader.readline()).decode().strip()
+        if not reply.startswith("OK"):
+            raise ConnectionError(f"Subscribe refused: {reply}")
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("cnc_server closed the connection")
+            line = line.decode().strip()
+            if line.startswith("EVT TELEM"):
+                yield parse_telemetry(line)
+    finally:
+        writer.close()
+
+class CNCClient:
+    """
+    Thread-safe client that keeps a small pool of keep-alive sessions to one
+    cnc_server. Each call borrows a session, so threads never share a socket
+    mid-request. Broken connections are replaced transparently, with
+    exponential backoff between connection attempts; a request whose
+    connection drops is resent only if it is in IDEMPOTENT_COMMANDS.
+    timeout bounds each connection attempt and retries how many are made.
+    """
+    def __init__(self, host: str = POCKETBEAGLE_IP, port: int = PORT,
+                 pool_size: int = POOL_SIZE, timeout: float = None, retries: int = CONNECT_RETRIES):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.reconnects = 0
+
+    def _connect(self) -> CNCSession:
+        delay = RETRY_BACKOFF
+        for attempt in range(self.retries):
+            session = CNCSession(self.host, self.port, self.timeout)
+            try:
+                session.connect()
+                return session
+            except OSError as e:
+                if attempt == self.retries - 1:
+                    raise ConnectionError(f"Could not reach cnc_server at {self.host}:{self.port}: {e}")
+                print(f"[Remote] Connect failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+
+    def _checkout(self) -> CNCSession:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _checkin(self, session: CNCSession):
+        try:
+            self._idle.put_nowait(session)
+        except queue.Full:
+            session.close()
+
+    def _discard(self, session: CNCSession):
+        if session.sock:
+            session.sock.close()
+            session.sock = None
+        with self._lock:
+            self.reconnects += 1
+
+    def pipeline(self, cmds) -> list:
+        cmds = list(cmds)
+        for attempt in range(2):
+            session = self._checkout()
+            try:
+                replies = session.pipeline(cmds)
+            except (OSError, ConnectionError):
+                self._discard(session)
+                # The other idle sessions most likely died the same way (server restart)
+                self._drop_idle()
+                retry_safe = all(cmd.split()[0] in IDEMPOTENT_COMMANDS for cmd in cmds if cmd.split())
+                if attempt == 0 and retry_safe:
+                    continue
+                raise
+            self._checkin(session)
+            return replies
+
+    def command(self, cmd: str) -> str:
+        return self.pipeline([cmd])[0]
+
+    def _drop_idle(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class JogChannel:
+    """
+    Streams jog targets to the Beagle's UDP jog channel. set_target() and
+    nudge() never block: they only replace the pending target, and a sender
+    thread sends the newest one at most every JOG_SEND_INTERVAL, so a burst
+    of keypresses becomes a single target. The Beagle abandons any jog in
+    progress as soon as a newer target arrives.
+    """
+    def __init__(self, host: str = POCKETBEAGLE_IP, port: int = JOG_PORT):
+        self.addr = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(0.2)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._settled = threading.Condition(self._lock)
+        self._target = None
+        self._pending = False
+        self._seq = int(time.time() * 1000) % 1000000  # Fresh range after a restart
+        self._done_seq = None
+        self.position = None    # Last position reported by the Beagle
+        self._running = True
+        threading.Thread(target=self._send_loop, daemon=True).start()
+        threading.Thread(target=self._receive_loop, daemon=True).start()
+
+    def set_target(self, x: float, y: float, z: float):
+        with self._lock:
+            self._target = (x, y, z)
+            self._pending = True
+        self._wake.set()
+        _moved()
+
+    def nudge(self, dx: float = 0.0, dy: float = 0.0, dz: float = 0.0):
+        """Move the pending target by an increment (starts from the last position reported)"""
+        with self._lock:
+            x, y, z = self._target or self.position or (0.0, 0.0, 0.0)
+        self.set_target(x + dx, y + dy, z + dz)
+
+    def _send_loop(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                if not self._pending:
+                    continue
+                self._seq += 1
+                seq, (x, y, z) = self._seq, self._target
+                self._pending = False
+            self.sock.sendto(f"JOG {seq} {x:.2f} {y:.2f} {z:.2f}".encode(), self.addr)
+            time.sleep(JOG_SEND_INTERVAL)
+
+    def _receive_loop(self):
+        while self._running:
+            try:
+                data, _ = self.sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            parts = data.decode().split()
+            if parts[0] == "DONE" and len(parts) == 5:
+                with self._lock:
+                    self._done_seq = int(parts[1])
+                    self.position = tuple(float(v) for v in parts[2:])
+                    self._settled.notify_all()
+                # DONE beats the Beagle's final state push, and a sample taken
+                # mid-move may have revalidated the mirror since set_target()
+                _moved()
+
+    def wait_settled(self, timeout: float = 10.0) -> bool:
+        """Wait until the Beagle reports it reached the newest target"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._done_seq != self._seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._settled.wait(min(remaining, 0.05))
+        return True
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self.sock.close()
+
+class MachineState:
+    """
+    Local mirror of the Beagle's position, XY travel limits, triggered limit
+    switches, homed flag and queue depth, kept current by
+    SUBSCRIBE <rate> DELTA on a connection of its own. The server pushes
+    only the fields that changed, right away when a motion job finishes.
+
+    Reads are answered from memory while the mirror is valid and has heard
+    from the server within max_age seconds; otherwise get() returns None
+    and the caller asks the server. invalidate() is called after motion
+    commands so a read never returns the position from before the move.
+    If the subscription drops, the mirror reconnects with backoff until
+    close().
+    """
+    def __init__(self, host: str = POCKETBEAGLE_IP, port: int = PORT,
+                 rate: float = MIRROR_RATE, max_age: float = MIRROR_MAX_AGE):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.max_age = max_age
+        self.state = {}
+        self.updated = None  # time.monotonic() of the last EVT STATE line
+        self.valid = False
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self._fresh = threading.Condition()
+        self._session = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._subscribe()
+        self._thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self._thread.start()
+
+    def _subscribe(self):
+        session = CNCSession(self.host, self.port)
+        session.connect()
+        reply = session.command(f"SUBSCRIBE {self.rate} DELTA")
+        if not reply.startswith("OK"):
+            session.close()
+            raise ConnectionError(f"Subscribe refused: {reply}")
+        self._session = session
+
+    def _receive_loop(self):
+        delay = RETRY_BACKOFF
+        while not self._stop.is_set():
+            try:
+                if self._session is None:
+                    self._subscribe()
+                    self.reconnects += 1
+                    delay = RETRY_BACKOFF
+                    print("[Remote] State mirror back")
+                while True:
+                    line = self._session._read_line()
+                    if line.startswith("EVT STATE"):
+                        self._apply(line)
+            except (OSError, ConnectionError, AttributeError) as e:
+                # Closed, or the Beagle went away; reads fall back to the network meanwhile
+                with self._fresh:
+                    self.valid = False
+                session, self._session = self._session, None
+                if session and session.sock:
+                    session.sock.close()
+                if self._stop.is_set():
+                    return
+                print(f"[Remote] State mirror lost ({e}), resubscribing in {delay:.1f}s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+
+    def _apply(self, line: str):
+        fields = dict(item.split("=", 1) for item in line.split()[2:])
+        with self._fresh:
+            for key, value in fields.items():
+                if key == "pos":
+                    self.state["position"] = tuple(float(v) for v in value.split(","))
+                elif key == "xy_limits":
+                    self.state["xy_limits"] = tuple(float(v) for v in value.split(","))
+                elif key == "switches":
+                    self.state["switches"] = [] if value == "-" else value.split(",")
+                elif key == "homed":
+                    self.state["homed"] = value == "1"
+                elif key == "queue":
+                    self.state["queue"] = int(value)
+            self.updated = time.monotonic()
+            self.valid = True
+            self._fresh.notify_all()
+
+    def invalidate(self):
+        """Distrust the mirror until the server pushes its next update"""
+        with self._fresh:
+            self.valid = False
+
+    def get(self, key: str, max_age: float = None, wait: float = MIRROR_WAIT):
+        """
+        Mirrored value of key ("position", "xy_limits", "switches", "homed",
+        "queue"), waiting up to `wait` seconds for a fresh update; None if
+        the mirror cannot answer.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        deadline = time.monotonic() + wait
+        with self._fresh:
+            while not (self.valid and time.monotonic() - self.updated <= max_age and key in self.state):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.misses += 1
+                    return None
+                self._fresh.wait(remaining)
+            self.hits += 1
+            return self.state[key]
+
+    def close(self):
+        self._stop.set()
+        session, self._session = self._session, None
+        if session:
+            session.close()
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        if self._session:  # Resubscribed just as close() was called
+            self._session.close()
+            self._session = None
+
+_mirror = None
+
+def start_state_mirror(rate: float = MIRROR_RATE, max_age: float = MIRROR_MAX_AGE,
+                       host: str = POCKETBEAGLE_IP, port: int = PORT) -> MachineState:
+    """Serve get_position() and friends from a server-fed mirror from now on"""
+    global _mirror
+    stop_state_mirror()
+    mirror = MachineState(host, port, rate, max_age)
+    mirror.start()
+    _mirror = mirror
+    return mirror
+
+def stop_state_mirror():
+    global _mirror
+    if _mirror:
+        _mirror.close()
+        _mirror = None
+
+def _mirrored(key: str):
+    return _mirror.get(key) if _mirror else None
+
+def _moved():
+    if _mirror:
+        _mirror.invalidate()
+
+class Heartbeat:
+    """
+    Liveness in both directions over a connection of its own. It arms the
+    Beagle's watchdog with HEARTBEAT <timeout> and PINGs every interval;
+    if the pings stop (this process hangs or dies) the Beagle stops motion
+    and parks Z. If a PONG is missing for `timeout` seconds the Beagle
+    counts as lost: alive goes False and requests waiting on any session
+    fail straight away instead of running into their own deadline. The
+    heartbeat keeps reconnecting until stop().
+    """
+    def __init__(self, host: str = POCKETBEAGLE_IP, port: int = PORT,
+                 interval: float = HEARTBEAT_INTERVAL, timeout: float = HEARTBEAT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.alive = False
+        self.rtt = None      # Seconds for the last PING / PONG
+        self.lost = 0        # Times the Beagle went silent
+        self._session = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._connect()
+        self._thread.start()
+
+    def _connect(self):
+        session = CNCSession(self.host, self.port, self.timeout)
+        session.connect()
+        reply = session.command(f"HEARTBEAT {self.timeout:g}", self.timeout)
+        if not reply.startswith("OK"):
+            session.close()
+            raise ConnectionError(f"Heartbeat refused: {reply}")
+        self._session = session
+        self.alive = True
+
+    def _ping(self, seq: int):
+        start = time.monotonic()
+        reply = self._session.command(f"PING {seq}", self.timeout)
+        if reply != f"PONG {seq}":
+            raise ConnectionError(f"Unexpected heartbeat reply: {reply}")
+        self.rtt = time.monotonic() - start
+
+    def _run(self):
+        seq = 0
+        while not self._stop.wait(self.interval):
+            try:
+                if self._session is None:
+                    self._connect()
+                    print("[Remote] Heartbeat back")
+                seq += 1
+                self._ping(seq)
+            except (OSError, ConnectionError) as e:
+                if self.alive:
+                    self.lost += 1
+                    print(f"[Remote] Lost the Beagle's heartbeat: {e}")
+                self.alive = False
+                if self._session:
+                    self._session.sock.close()
+                    self._session = None
+
+    def stop(self):
+        """Stop pinging; QUIT disarms the watchdog, so this does not stop the machine"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if self._session:
+            self._session.close()
+            self._session = None
+        self.alive = False
+
+_heartbeat = None
+
+def start_heartbeat(interval: float = HEARTBEAT_INTERVAL, timeout: float = HEARTBEAT_TIMEOUT,
+                    host: str = POCKETBEAGLE_IP, port: int = PORT) -> Heartbeat:
+    """Arm the Beagle's watchdog and let every request fail fast if the Beagle goes silent"""
+    global _heartbeat
+    stop_heartbeat()
+    heartbeat = Heartbeat(host, port, interval, timeout)
+    heartbeat.start()
+    _heartbeat = heartbeat
+    return heartbeat
+
+def stop_heartbeat():
+    global _heartbeat
+    if _heartbeat:
+        _heartbeat, heartbeat = None, _heartbeat
+        heartbeat.stop()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client() -> CNCClient:
+    """Shared client for POCKETBEAGLE_IP, created on first use"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = CNCClient()
+        return _default_client
+
+def send_command(cmd: str, session: CNCSession = None) -> str:
+    """Send one command over session if given, else over the shared pooled client"""
+    if session is not None:
+        return session.command(cmd)
+    return get_client().command(cmd)
+
+def jog_to(x: float, y: float, z: float, session: CNCSession = None):
     print(f"[Remote] Jog to X={x:.2f} Y={y:.2f} Z={z:.2f}")
-    return send_command(f"JOG_TO {x:.2f} {y:.2f} {z:.2f}")
+    response = send_command(f"JOG_TO {x:.2f} {y:.2f} {z:.2f}", session)
+    _moved()
+    return response
+
+def jog_to_async(x: float, y: float, z: float, session: CNCSession):
+    """
+    Queue a jog and return its job id without waiting for the move.
+    The server pushes "EVT DONE <id> <result> <seconds>" on the same
+    session when it finishes; use session.wait_done(id) or job_status(id).
+    If the Beagle's motion queue is full ("BUSY QUEUE_FULL") this backs
+    off and retries, so a fast producer is held to the machine's pace.
+    """
+    print(f"[Remote] Queue jog to X={x:.2f} Y={y:.2f} Z={z:.2f}")
+    delay = RETRY_BACKOFF
+    for _ in range(CONNECT_RETRIES):
+        response = session.command(f"JOG_TO_ASYNC {x:.2f} {y:.2f} {z:.2f}")
+        if not response.startswith("BUSY"):
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_BACKOFF)
+    if response.startswith("ACK"):
+        return int(response.split()[1])
+    print("[Remote] Jog not accepted:", response)
+    return None
+
+def job_status(job_id: int, session: CNCSession = None) -> str:
+    return send_command(f"STATUS {job_id}", session)
+
+def cancel_job(job_id: int, session: CNCSession = None) -> bool:
+    """
+    Drop a queued job ("OK CANCELLED id"), or stop a running one at the
+    next motor step ("OK CANCELLING id", then EVT DONE id CANCELLED)
+    """
+    return send_command(f"CANCEL {job_id}", session).startswith("OK")
 
-def get_position():
-    response = send_command("GET_POSITION")
+def flush_queue(session: CNCSession = None) -> int:
+    """Drop every queued motion job that has not started; returns how many"""
+    response = send_command("FLUSH", session)
+    return int(response.split()[2]) if response.startswith("OK FLUSHED") else 0
+
+def queue_status(session: CNCSession = None) -> dict:
+    """
+    Parse QUEUE_STATUS into a dict: depth, max, running and queued
+    ({job id: seconds so far}), recent, avg_wait and avg_exec.
+    """
+    response = send_command("QUEUE_STATUS", session)
+    status = {}
+    for field in response.split()[1:]:
+        key, value = field.split("=")
+        if key in ("running", "queued"):
+            status[key] = {} if value == "-" else {
+                int(job_id): float(seconds)
+                for job_id, seconds in (entry.split(":") for entry in value.split(","))}
+        elif key in ("avg_wait", "avg_exec"):
+            status[key] = float(value)
+        else:
+            status[key] = int(value)
+    return status
+
+def run_path(points, session: CNCSession = None) -> str:
+    """
+    Send a whole list of waypoints as one PATH command. Each point is
+    (x, y, z) or (x, y, z, dwell_seconds). The Beagle checks the full path
+    and plans it before moving, and replies once the last point is reached.
+    """
+    waypoints = []
+    for point in points:
+        if len(point) == 4 and point[3]:
+            waypoints.append(f"{point[0]:.2f},{point[1]:.2f},{point[2]:.2f},{point[3]:.2f}")
+        else:
+            waypoints.append(f"{point[0]:.2f},{point[1]:.2f},{point[2]:.2f}")
+    print(f"[Remote] Run path with {len(waypoints)} waypoints")
+    response = send_command("PATH " + " ".join(waypoints), session)
+    _moved()
+    return response
+
+def move_piece(x1: int, y1: int, x2: int, y2: int, session: CNCSession = None):
+    """
+    Have the Beagle do a whole pick-and-place between two board squares.
+    Returns a dict of phase -> seconds, or None if the move failed.
+    """
+    print(f"[Remote] Move piece {x1},{y1} -> {x2},{y2}")
+    response = send_command(f"MOVE {x1} {y1} {x2} {y2}", session)
+    _moved()
+    if not response.startswith("OK MOVE"):
+        print("[Remote] Move failed:", response)
+        return None
+    timings = {}
+    for entry in response.split()[2:]:
+        name, seconds = entry.split("=")
+        timings[name] = float(seconds)
+    return timings
+
+def set_board(x0: float, y0: float, square_x: float, square_y: float, session: CNCSession = None):
+    """Tell the Beagle where square (0, 0) is centred and the square pitch on each axis"""
+    return send_command(f"SET_BOARD {x0:.3f} {y0:.3f} {square_x:.3f} {square_y:.3f}", session)
+
+def home(session: CNCSession = None) -> bool:
+    """Re-home all axes; replies once homing has finished"""
+    response = send_command("HOME", session)
+    _moved()
+    return response.startswith("OK")
+
+def wait_homed(timeout: float = 60.0, poll: float = 0.2, session: CNCSession = None) -> bool:
+    """
+    The Beagle answers straight after boot and homes in the background,
+    refusing motion with ERROR NOT_HOMED until then. Wait for homing;
+    False if it times out or the Beagle reports that bring-up failed.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if session is None and _mirrored("homed"):
+            return True
+        response = send_command("STARTUP", session)
+        if response.startswith("STARTUP homed=1"):
+            return True
+        if " FAILED " in response:
+            print("[Remote] Beagle start-up failed:", response.split(" FAILED ", 1)[1])
+            return False
+        time.sleep(poll)
+    return False
+
+def get_stats(session: CNCSession = None) -> dict:
+    """Server counters, latency histogram summaries and motion duty cycle"""
+    return json.loads(send_command("STATS", session))
+
+def get_position(session: CNCSession = None):
+    if session is None:
+        position = _mirrored("position")
+        if position is not None:
+            return position
+    response = send_command("GET_POSITION", session)
     if response.startswith("POS"):
         _, x, y, z = response.split()
         return float(x), float(y), float(z)
@@ -24,8 +841,12 @@ def get_position():
         print("[Remote] Failed to get position")
         return None
 
-def get_xy_limits():
-    response = send_command("GET_XY_LIMITS")
+def get_xy_limits(session: CNCSession = None):
+    if session is None:
+        limits = _mirrored("xy_limits")
+        if limits is not None:
+            return limits
+    response = send_command("GET_XY_LIMITS", session)
     try:
         x_min, x_max, y_min, y_max = map(float, response.split(","))
         return x_min, x_max, y_min, y_max
@@ -38,3 +859,14 @@ if __name__ == "__main__":
     jog_to(10, 10, 2)
     print("Position:", get_position())
     print("XY Limits:", get_xy_limits())
+
+    print("Pipelined session test:")
+    with CNCSession() as session:
+        for reply in session.pipeline(["GET_POSITION", "GET_XY_LIMITS", "GET_POSITION"]):
+            print("  ", reply)
+
+        print("Async jog test:")
+        job_ids = [jog_to_async(20, 20, 2, session), jog_to_async(10, 10, 2, session)]
+        print("  Queued jobs:", job_ids, "position now:", get_position(session))
+        for job_id in job_ids:
+            print("  ", session.wait_done(job_id))